@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Check the collect/publish loop against the low-footprint memory targets.
+
+Runs DataCollector and MQTTPublisher in-process without a broker and measures:
+  - RSS after the run, for the collect/publish core only unless --full is given
+  - peak transient allocation of every collection tick, split into regular
+    ticks and the once-per-window probe tick that also reads disks and
+    hardware sensors (the maximum of each is checked, not the median)
+  - memory retained per publish window once warmed up (should not grow)
+
+Exits with status 1 when LOW_FOOTPRINT mode misses a target, so it can run in CI.
+
+Examples:
+    python footprint_check.py
+    python footprint_check.py --compare
+    python footprint_check.py --full
+"""
+import argparse
+import gc
+import importlib
+import logging
+import sys
+import tracemalloc
+
+import psutil
+
+from modules.data_collector import DataCollector
+from modules.mqtt_publisher import MQTTPublisher
+from modules.sensor_config import SensorConfig
+
+# Documented targets for LOW_FOOTPRINT=true, see README
+TARGET_CORE_RSS_MB = 30
+TARGET_TICK_PEAK_KB = 48
+TARGET_PROBE_TICK_PEAK_KB = 96
+TARGET_WINDOW_GROWTH_KB = 2
+
+# Imported by ha_desk.py on top of the collect/publish core
+AGENT_DEPENDENCIES = ["paho.mqtt.client", "dotenv", "fastapi", "uvicorn", "PIL", "pystray"]
+
+
+class NullClient:
+    """Stand-in MQTT client that accepts and discards every publish"""
+
+    def is_connected(self):
+        return True
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        return None
+
+
+def run_window(data_collector, mqtt_publisher, peaks=None):
+    """Run one publish window, keeping the largest tick peak allocations in peaks when tracing"""
+    for _ in range(data_collector.max_samples):
+        # Low-footprint mode runs the disk and hardware probes on the first tick of a window
+        probe_tick = not data_collector.low_footprint or data_collector.ticks % data_collector.max_samples == 0
+        if peaks is not None:
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        data_collector.collect_metrics()
+        if peaks is not None:
+            # Running maxima rather than lists, which would show up as retained memory
+            peak = tracemalloc.get_traced_memory()[1] - current
+            kind = "probe" if probe_tick else "tick"
+            peaks[kind] = max(peaks[kind], peak)
+            peaks["regular_ticks"] += not probe_tick
+    data_collector.calculate_statistics()
+    unified_data = data_collector.get_unified_data()
+    mqtt_publisher.publish_system_info({"uptime": unified_data["uptime"]["seconds"]}, unified_data["metrics"])
+
+
+def measure(low_footprint, windows=20, publish_interval=30):
+    """Measure one configuration and return its results"""
+    data_collector = DataCollector(1, publish_interval, low_footprint=low_footprint)
+    sensor_config = SensorConfig("Footprint Check", "footprint_check")
+    mqtt_publisher = MQTTPublisher(NullClient(), "footprint_check", sensor_config, low_footprint)
+
+    # Warm up caches, sensor discovery and the probe worker threads
+    for _ in range(2):
+        run_window(data_collector, mqtt_publisher)
+
+    # Allocations made once after tracing starts are not growth, so the
+    # baseline is taken after two traced windows
+    tracemalloc.start()
+    for _ in range(2):
+        run_window(data_collector, mqtt_publisher)
+    gc.collect()
+    retained_before = tracemalloc.get_traced_memory()[0]
+
+    peaks = {"tick": 0, "probe": 0, "regular_ticks": 0}
+    for _ in range(windows):
+        run_window(data_collector, mqtt_publisher, peaks)
+
+    gc.collect()
+    retained_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "rss_mb": psutil.Process().memory_info().rss / (1024 * 1024),
+        # The default mode probes on every tick, so it has no regular ticks
+        "regular_ticks": peaks["regular_ticks"],
+        "tick_peak_kb": peaks["tick"] / 1024,
+        "probe_peak_kb": peaks["probe"] / 1024,
+        "window_growth_kb": max(0, retained_after - retained_before) / windows / 1024,
+    }
+
+
+def report(title, results, rss_label):
+    print(title)
+    print(f"  {rss_label + ':':<27}{results['rss_mb']:.1f} MB")
+    if results["regular_ticks"]:
+        print(f"  Max peak per regular tick: {results['tick_peak_kb']:.1f} KB")
+    else:
+        print("  Max peak per regular tick: n/a, probes run every tick")
+    print(f"  Max peak per probe tick:   {results['probe_peak_kb']:.1f} KB")
+    print(f"  Retained per window:       {results['window_growth_kb']:.2f} KB")
+
+
+def main():
+    if sys.version_info < (3, 9):
+        print("footprint_check.py needs Python 3.9+ for tracemalloc.reset_peak()")
+        return 2
+
+    parser = argparse.ArgumentParser(description="Check the low-footprint memory targets")
+    parser.add_argument("--windows", type=int, default=20, help="publish windows to measure (default: 20)")
+    parser.add_argument("--publish-interval", type=int, default=30, help="samples per window (default: 30)")
+    parser.add_argument("--compare", action="store_true", help="also measure the default mode")
+    parser.add_argument("--full", action="store_true",
+                        help="import the web server and tray dependencies first to report whole-agent RSS")
+    args = parser.parse_args()
+
+    # Only memory is measured here, keep probe and publish log output quiet
+    logging.basicConfig(level=logging.CRITICAL)
+
+    rss_label = "RSS (core only)"
+    if args.full:
+        for module in AGENT_DEPENDENCIES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Cannot import {module} for --full: {e}")
+                return 2
+        rss_label = "RSS (whole agent)"
+
+    results = measure(True, args.windows, args.publish_interval)
+    report("LOW_FOOTPRINT=true", results, rss_label)
+    if args.compare:
+        # RSS only grows, so the default mode is measured second
+        report("LOW_FOOTPRINT=false", measure(False, args.windows, args.publish_interval), rss_label)
+
+    failures = []
+    # The RSS target covers the core only; --full reports the whole agent for reference
+    if not args.full and results["rss_mb"] > TARGET_CORE_RSS_MB:
+        failures.append(f"core RSS {results['rss_mb']:.1f} MB > {TARGET_CORE_RSS_MB} MB")
+    if results["tick_peak_kb"] > TARGET_TICK_PEAK_KB:
+        failures.append(f"peak per regular tick {results['tick_peak_kb']:.1f} KB > {TARGET_TICK_PEAK_KB} KB")
+    if results["probe_peak_kb"] > TARGET_PROBE_TICK_PEAK_KB:
+        failures.append(f"peak per probe tick {results['probe_peak_kb']:.1f} KB > {TARGET_PROBE_TICK_PEAK_KB} KB")
+    if results["window_growth_kb"] > TARGET_WINDOW_GROWTH_KB:
+        failures.append(f"retained per window {results['window_growth_kb']:.2f} KB > {TARGET_WINDOW_GROWTH_KB} KB")
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        return 1
+    print("All low-footprint targets met")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Gateway mode: poll many ha-desk agents over HTTP and publish them to MQTT.
+
+For network segments that cannot reach the broker, a gateway host polls each
+agent's /system endpoint and publishes discovery and state for every remote
+device over one shared MQTT connection, using the same SensorConfig and
+MQTTPublisher code as the agent itself.
+
+Targets are read from a JSON file:
+    [
+        {"url": "http://desk-01:8000", "device_id": "desk-01", "name": "Desk 01"},
+        {"url": "http://desk-02:8000"}
+    ]
+
+Examples:
+    python gateway.py --targets targets.json
+    python gateway.py --stand-in 200 --embedded-broker --port 18830 --interval 10
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import paho.mqtt.client as mqtt
+from dotenv import load_dotenv
+
+from modules.sensor_config import SensorConfig
+from modules.mqtt_publisher import MQTTPublisher
+from modules.cgroup_metrics import CgroupCollector
+from modules.cpu_accounting import CpuAccounting
+from load_test import percentiles, format_ms
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("gateway")
+
+# MQTT Configuration
+MQTT_BROKER = os.getenv('MQTT_BROKER', 'localhost')
+MQTT_PORT = int(os.getenv('MQTT_PORT', '1883'))
+MQTT_USERNAME = os.getenv('MQTT_USERNAME', '')
+MQTT_PASSWORD = os.getenv('MQTT_PASSWORD', '')
+GATEWAY_ID = os.getenv('GATEWAY_ID', 'ha_desk_gateway')
+GATEWAY_AVAILABILITY_TOPIC = f"homeassistant/binary_sensor/{GATEWAY_ID}/availability"
+
+
+class GatewayTarget:
+    """One remote agent, polled over a reused keep-alive HTTP connection"""
+
+    def __init__(self, url, device_id, device_name, mqtt_client, timeout=5, offline_after=3, deadline=10):
+        parts = urlsplit(url)
+        self.url = url
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.path = parts.path.rstrip("/") + "/system"
+        self.timeout = timeout
+        self.deadline = deadline
+        self.offline_after = offline_after
+        self.connection = None
+        # Future of the running poll, a target is never polled twice at once
+        self.in_flight = None
+
+        self.device_id = device_id
+        # The gateway's last will must take its bridged devices offline too
+        self.sensor_config = SensorConfig(device_name, device_id,
+                                          gateway_availability_topic=GATEWAY_AVAILABILITY_TOPIC)
+        self.mqtt_publisher = MQTTPublisher(mqtt_client, device_id, self.sensor_config)
+        # Remote agents may report CPU breakdown and cgroup metrics; absent ones are skipped
+        self.optional_metrics = {**CpuAccounting.METRICS, **CgroupCollector.METRICS}
+        self.mqtt_publisher.metrics.update(self.optional_metrics)
+
+        self.failures = 0
+        self.configs_published = False
+        self.last_latency = None
+
+    def _connect(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _limit_timeout(self, deadline):
+        """Cap the next socket operation at the time left before the poll deadline"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"poll deadline of {self.deadline}s exceeded")
+        self.connection.timeout = min(self.timeout, remaining)
+        if self.connection.sock is not None:
+            self.connection.sock.settimeout(self.connection.timeout)
+
+    def _read_body(self, response, deadline):
+        # Read in chunks so an agent trickling its response cannot outlive the deadline
+        chunks = []
+        while True:
+            self._limit_timeout(deadline)
+            chunk = response.read1(65536)
+            if not chunk:
+                # read1() leaves the response open, read() finishes it for keep-alive
+                response.read()
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def fetch(self, deadline):
+        """Fetch the agent's unified data, reconnecting once if keep-alive went stale"""
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self._connect()
+            try:
+                self._limit_timeout(deadline)
+                self.connection.request("GET", self.path, headers={"Connection": "keep-alive"})
+                self._limit_timeout(deadline)
+                response = self.connection.getresponse()
+                body = self._read_body(response, deadline)
+                if response.status != 200:
+                    raise http.client.HTTPException(f"HTTP {response.status}")
+                if response.will_close:
+                    self.close()
+                return json.loads(body)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The agent closed an idle connection, retry on a fresh one
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def fail(self, reason):
+        """Record a failed poll, marking the device offline after offline_after in a row"""
+        self.failures += 1
+        self.last_latency = None
+        if self.failures == self.offline_after:
+            logger.warning(f"{self.url} unreachable for {self.failures} polls, marking offline: {reason}")
+            self.mqtt_publisher.publish_offline_status()
+        else:
+            logger.debug(f"Failed to poll {self.url}: {reason}")
+
+    def poll(self):
+        """Poll the agent and publish its state, returning True on success"""
+        started = time.perf_counter()
+        try:
+            data = self.fetch(time.monotonic() + self.deadline)
+        except Exception as e:
+            self.fail(e)
+            return False
+        self.last_latency = time.perf_counter() - started
+
+        metrics = data.get("metrics", {})
+        if not self.configs_published or self.failures >= self.offline_after:
+            for metric_key, metric_name in self.optional_metrics.items():
+                if metric_key in metrics and metric_name not in self.sensor_config.metrics:
+                    self.sensor_config.metrics.append(metric_name)
+            self.mqtt_publisher.publish_availability("online")
+            self.sensor_config.publish_configs(self.mqtt_publisher.mqtt_client)
+            self.configs_published = True
+        self.failures = 0
+
+        self.mqtt_publisher.publish_system_info(
+            {"uptime": data.get("uptime", {}).get("seconds", 0)},
+            metrics
+        )
+        return True
+
+
+def load_targets(path):
+    """Read the target list, deriving device ids from the URL when missing"""
+    with open(path) as f:
+        entries = json.load(f)
+    targets = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        parts = urlsplit(entry["url"])
+        derived_id = re.sub(r'[^a-zA-Z0-9_-]+', '_', f"{parts.hostname}_{parts.port or 80}")
+        targets.append({
+            "url": entry["url"],
+            "device_id": entry.get("device_id", derived_id),
+            "name": entry.get("name", parts.hostname)
+        })
+    return targets
+
+
+def start_stand_in_agents(count, publish_interval):
+    """Start local HTTP servers that answer /system with synthetic agent data"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from load_test import SyntheticDataCollector
+
+    targets = []
+    for index in range(count):
+        collector = SyntheticDataCollector(1, publish_interval)
+        lock = threading.Lock()
+
+        class StandInHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            data_collector = collector
+            data_lock = lock
+
+            def do_GET(self):
+                with self.data_lock:
+                    self.data_collector.collect_metrics()
+                    self.data_collector.calculate_statistics()
+                    body = json.dumps(self.data_collector.get_unified_data()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        targets.append({
+            "url": f"http://127.0.0.1:{server.server_address[1]}",
+            "device_id": f"standin-{index:05d}",
+            "name": f"Stand-in {index:05d}"
+        })
+    logger.info(f"Started {count} stand-in agents")
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bridge many ha-desk HTTP agents to MQTT")
+    parser.add_argument("--targets", help="JSON file with the agents to poll")
+    parser.add_argument("--interval", type=float, default=30, help="poll interval in seconds (default: 30)")
+    parser.add_argument("--concurrency", type=int, default=32, help="maximum concurrent polls (default: 32)")
+    parser.add_argument("--timeout", type=float, default=5, help="per-target socket timeout in seconds (default: 5)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="overall deadline per poll in seconds (default: the smaller of 10 and half the interval)")
+    parser.add_argument("--offline-after", type=int, default=3,
+                        help="failed polls before a device is marked offline (default: 3)")
+    parser.add_argument("--stand-in", type=int, default=0, help="poll this many local stand-in agents instead")
+    parser.add_argument("--embedded-broker", action="store_true", help="run a minimal in-process MQTT sink")
+    parser.add_argument("--host", default=MQTT_BROKER, help="MQTT broker address")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="MQTT broker port")
+    args = parser.parse_args()
+    if args.deadline is None:
+        args.deadline = min(10, args.interval / 2)
+
+    if args.stand_in:
+        target_entries = start_stand_in_agents(args.stand_in, int(args.interval))
+    elif args.targets:
+        target_entries = load_targets(args.targets)
+    else:
+        parser.error("either --targets or --stand-in is required")
+
+    if args.embedded_broker:
+        from load_test import EmbeddedBroker
+        broker = EmbeddedBroker('127.0.0.1', args.port)
+        broker.start()
+        args.host = '127.0.0.1'
+
+    # One shared MQTT connection for every remote device
+    mqtt_client = mqtt.Client(client_id=GATEWAY_ID)
+    if MQTT_USERNAME and MQTT_PASSWORD:
+        mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+    mqtt_client.will_set(GATEWAY_AVAILABILITY_TOPIC, "offline", retain=True)
+
+    targets = [
+        GatewayTarget(entry["url"], entry["device_id"], entry["name"], mqtt_client,
+                      args.timeout, args.offline_after, args.deadline)
+        for entry in target_entries
+    ]
+
+    def on_connect(client, userdata, flags, rc):
+        if rc == 0:
+            logger.info(f"Connected to MQTT broker, bridging {len(targets)} agents")
+            client.publish(GATEWAY_AVAILABILITY_TOPIC, "online", retain=True)
+            # Republish discovery for every device after a reconnect
+            for target in targets:
+                target.configs_published = False
+        else:
+            logger.error(f"Failed to connect to MQTT broker with code: {rc}")
+
+    mqtt_client.on_connect = on_connect
+    connected = False
+    try:
+        mqtt_client.connect(args.host, args.port, 60)
+        connected = True
+    except Exception as e:
+        # Retried by the poll loop, like the agent does
+        logger.error(f"Failed to connect to MQTT broker: {e}")
+    mqtt_client.loop_start()
+
+    # Give the broker a moment to acknowledge before the first cycle
+    startup_deadline = time.monotonic() + 5
+    while connected and not mqtt_client.is_connected() and time.monotonic() < startup_deadline:
+        time.sleep(0.1)
+
+    # Run the offline cleanup below when stopped as a service too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    executor = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="poll")
+    try:
+        next_cycle = time.monotonic()
+        while True:
+            cycle_started = time.monotonic()
+            if mqtt_client.is_connected():
+                futures = {}
+                for target in targets:
+                    if target.in_flight is not None and not target.in_flight.done():
+                        # Still stuck in an earlier poll, do not tie up another worker
+                        target.fail("previous poll still running")
+                        continue
+                    target.in_flight = executor.submit(target.poll)
+                    futures[target.in_flight] = target
+
+                # Polls left at the cycle deadline count as failed so one slow
+                # agent cannot stretch the cycle; queued ones are not started
+                done, late = wait(futures, timeout=args.interval * 0.9)
+                for future in late:
+                    futures[future].fail("not polled within the cycle" if future.cancel() else "missed the cycle deadline")
+                succeeded = sum(1 for future in done if future.result())
+                latencies = [target.last_latency for target in targets if target.last_latency is not None]
+                logger.info(f"Polled {succeeded}/{len(targets)} agents in {time.monotonic() - cycle_started:.2f}s "
+                            f"({len(late)} late), latency {format_ms(percentiles(latencies, (50, 99)))}")
+            else:
+                logger.warning("Not connected to MQTT broker, skipping poll cycle")
+                try:
+                    mqtt_client.reconnect()
+                except Exception as e:
+                    logger.error(f"Failed to reconnect to MQTT broker: {e}")
+
+            # Keep a fixed cadence regardless of how long the cycle took
+            next_cycle += args.interval
+            delay = next_cycle - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_cycle = time.monotonic()
+    except KeyboardInterrupt:
+        logger.info("Shutting down gateway")
+    finally:
+        executor.shutdown(wait=False)
+        for target in targets:
+            target.mqtt_publisher.publish_offline_status()
+            target.close()
+        mqtt_client.publish(GATEWAY_AVAILABILITY_TOPIC, "offline", retain=True)
+        time.sleep(1)
+        mqtt_client.disconnect()
+        mqtt_client.loop_stop()
+
+
+if __name__ == "__main__":
+    main()
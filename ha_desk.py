@@ -3,6 +3,8 @@ from PIL import Image, ImageDraw
 import threading
 import uvicorn
 from fastapi import FastAPI
+from fastapi import HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import time
 import os
@@ -11,11 +13,16 @@ import logging
 from logging.handlers import RotatingFileHandler
 import paho.mqtt.client as mqtt
 import socket
+import sys
 import uuid
 
 from modules.sensor_config import SensorConfig
 from modules.data_collector import DataCollector
 from modules.mqtt_publisher import MQTTPublisher
+from modules.publish_scheduler import PublishScheduler
+from modules.profiler import DebugProfiler
+from modules.cgroup_metrics import CgroupCollector
+from modules.metrics_archive import MetricsArchive
 
 # Load environment variables
 load_dotenv()
@@ -83,6 +90,44 @@ CLEANUP_SENSORS_ON_START = os.getenv('CLEANUP_SENSORS_ON_START', 'true').lower()
 COLLECTION_INTERVAL = 1  # Collect data every second
 PUBLISH_INTERVAL = 30    # Publish every 30 seconds
 
+# Temperature, fan and battery sensors are read less often; 0 disables them
+HARDWARE_SENSOR_INTERVAL = int(os.getenv('HARDWARE_SENSOR_INTERVAL', '10'))
+
+# Deadline in seconds for disk and hardware probes before they are marked stale
+COLLECTOR_TIMEOUT = float(os.getenv('COLLECTOR_TIMEOUT', '0.5'))
+
+# cgroup v2 quota-relative metrics: auto (only when limited), true or false
+CGROUP_METRICS = os.getenv('CGROUP_METRICS', 'auto').lower()
+
+# Align publish cycles to wall-clock slots, offset per device to spread broker load
+ALIGN_PUBLISH_SLOTS = os.getenv('ALIGN_PUBLISH_SLOTS', 'false').lower() == 'true'
+
+# Debug profiling endpoints and periodic profile dumps (seconds, 0 disables)
+DEBUG_ENDPOINTS = os.getenv('DEBUG_ENDPOINTS', 'false').lower() == 'true'
+PROFILE_DUMP_INTERVAL = int(os.getenv('PROFILE_DUMP_INTERVAL', '0'))
+MAX_PROFILE_SECONDS = 300
+
+# CPU user/system/iowait/steal sensors next to the total CPU usage
+CPU_BREAKDOWN = os.getenv('CPU_BREAKDOWN', 'true').lower() == 'true'
+
+# Compact sample storage and no per-cycle allocations for small devices
+LOW_FOOTPRINT = os.getenv('LOW_FOOTPRINT', 'false').lower() == 'true'
+
+def get_user_data_dir():
+    """Get a per-user data directory that survives restarts of the packaged executable"""
+    if os.name == 'nt':
+        base = os.getenv('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.getenv('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'HAdesk')
+
+# Local archive of per-window statistics, kept for this many days (0 disables).
+# Not next to __file__: a onefile executable runs from a temporary directory.
+ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', '0'))
+archive_dir = os.getenv('ARCHIVE_DIR') or os.path.join(get_user_data_dir(), 'archive')
+
 # Check DEV_MODE and update logging level if needed
 if os.getenv('DEV_MODE', 'false').lower() == 'true':
     logger.info("DEV_MODE is true, updating logging level to DEBUG")
@@ -109,9 +154,18 @@ if MQTT_USERNAME and MQTT_PASSWORD:
 lwt_topic = f"homeassistant/binary_sensor/{DEVICE_ID}/availability"
 mqtt_client.will_set(lwt_topic, "offline", retain=True)
 
-data_collector = DataCollector(COLLECTION_INTERVAL, PUBLISH_INTERVAL)
-mqtt_publisher = MQTTPublisher(mqtt_client, DEVICE_ID)
+data_collector = DataCollector(COLLECTION_INTERVAL, PUBLISH_INTERVAL, HARDWARE_SENSOR_INTERVAL,
+                               COLLECTOR_TIMEOUT, CGROUP_METRICS, LOW_FOOTPRINT, CPU_BREAKDOWN)
 sensor_config = SensorConfig(DEVICE_NAME, DEVICE_ID)
+mqtt_publisher = MQTTPublisher(mqtt_client, DEVICE_ID, sensor_config, LOW_FOOTPRINT)
+sensor_config.metrics.extend(data_collector.cpu_accounting.metrics.values())
+mqtt_publisher.metrics.update(data_collector.cpu_accounting.metrics)
+if data_collector.cgroup:
+    sensor_config.metrics.extend(CgroupCollector.METRICS.values())
+    mqtt_publisher.metrics.update(CgroupCollector.METRICS)
+debug_profiler = DebugProfiler()
+metrics_archive = MetricsArchive(archive_dir, ARCHIVE_RETENTION_DAYS) if ARCHIVE_RETENTION_DAYS else None
+publish_scheduler = PublishScheduler(DEVICE_ID, PUBLISH_INTERVAL, COLLECTION_INTERVAL, ALIGN_PUBLISH_SLOTS)
 
 def on_connect(client, userdata, flags, rc):
     """Callback for when the client connects to the MQTT broker"""
@@ -133,6 +187,7 @@ def on_connect(client, userdata, flags, rc):
             time.sleep(2)
         
         # Publish availability status immediately upon connection
+        mqtt_publisher.reset_configs()
         mqtt_publisher.publish_availability("online")
         sensor_config.publish_configs(mqtt_client)
     else:
@@ -165,6 +220,35 @@ async def system_info():
     logger.debug("System info requested")
     return data_collector.get_unified_data()
 
+@app.get("/archive")
+async def archive_export(start: float = None, end: float = None, format: str = "csv"):
+    """Stream archived statistics for a time range as CSV or NDJSON"""
+    if metrics_archive is None:
+        raise HTTPException(status_code=404, detail="Archive is disabled, set ARCHIVE_RETENTION_DAYS")
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 86400
+    logger.debug(f"Archive export requested from {start} to {end} as {format}")
+    if format == "csv":
+        return StreamingResponse(metrics_archive.export_csv(start, end), media_type="text/csv")
+    return StreamingResponse(metrics_archive.export_ndjson(start, end), media_type="application/x-ndjson")
+
+if DEBUG_ENDPOINTS:
+    @app.get("/debug/profile", response_class=PlainTextResponse)
+    def debug_profile(seconds: int = 30, thread: str = "mqtt_publish_loop", limit: int = 30):
+        """Sample a thread's stack for a bounded time"""
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        logger.info(f"Profiling thread {thread} for {seconds}s")
+        return debug_profiler.profile_thread(thread, seconds, limit)
+
+    @app.get("/debug/tracemalloc", response_class=PlainTextResponse)
+    def debug_tracemalloc(limit: int = 20, stop: bool = False):
+        """Start tracemalloc or return the allocation diff since the previous call"""
+        if stop:
+            return debug_profiler.stop_tracemalloc()
+        return debug_profiler.tracemalloc_report(limit)
+
 def run_server():
     """Run the FastAPI server"""
     host = os.getenv('HOST', '0.0.0.0')
@@ -200,28 +284,43 @@ def mqtt_publish_loop():
     """Background thread for publishing MQTT updates"""
     while server_running:
         try:
+            # Keep collecting and archiving while the broker is down, only the
+            # publish step is skipped until a reconnect succeeds
             if not mqtt_client.is_connected():
                 logger.info("Attempting to reconnect to MQTT broker...")
                 try:
                     mqtt_client.reconnect()
-                    # Wait a moment for connection to establish
-                    time.sleep(2)
                 except Exception as e:
                     logger.error(f"Failed to reconnect to MQTT broker: {e}")
-                    time.sleep(10)  # Wait longer before retrying
-                    continue
             
             # Collect metrics every second
-            for _ in range(PUBLISH_INTERVAL):
-                if not server_running:
-                    break
-                data_collector.collect_metrics()
-                time.sleep(COLLECTION_INTERVAL)
+            if publish_scheduler.align:
+                for tick in publish_scheduler.collection_ticks():
+                    if not server_running:
+                        break
+                    publish_scheduler.sleep_until(tick)
+                    data_collector.collect_metrics()
+            else:
+                for _ in range(PUBLISH_INTERVAL):
+                    if not server_running:
+                        break
+                    data_collector.collect_metrics()
+                    time.sleep(COLLECTION_INTERVAL)
             
-            # Publish aggregated data every 30 seconds
-            if server_running and mqtt_client.is_connected():
+            if server_running:
                 data_collector.calculate_statistics()
                 unified_data = data_collector.get_unified_data()
+
+                # Archive the window whether or not it can be published
+                if metrics_archive:
+                    try:
+                        metrics_archive.append(unified_data["timestamp"], unified_data["uptime"]["seconds"],
+                                               unified_data["metrics"])
+                    except Exception as e:
+                        logger.error(f"Error writing to metrics archive: {e}")
+
+            # Publish aggregated data every 30 seconds
+            if server_running and mqtt_client.is_connected():
                 mqtt_publisher.publish_system_info(
                     {"uptime": unified_data["uptime"]["seconds"]},
                     unified_data["metrics"]
@@ -244,9 +343,13 @@ def main():
         logger.error(f"Failed to connect to MQTT broker: {e}")
     
     # Start MQTT publish thread
-    mqtt_thread = threading.Thread(target=mqtt_publish_loop)
+    mqtt_thread = threading.Thread(target=mqtt_publish_loop, name="mqtt_publish_loop")
     mqtt_thread.daemon = True
     mqtt_thread.start()
+
+    if PROFILE_DUMP_INTERVAL:
+        debug_profiler.start_periodic_dumps("mqtt_publish_loop", log_dir, PROFILE_DUMP_INTERVAL,
+                                            min(30, PROFILE_DUMP_INTERVAL))
     
     # Start the API server in a separate thread
     server_thread = threading.Thread(target=run_server)
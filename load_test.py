@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Load test harness that simulates a fleet of ha-desk agents against an MQTT broker.
+
+Each virtual agent has its own DEVICE_ID and runs the real SensorConfig and
+MQTTPublisher code paths on synthetic DataCollector samples. Agents are spread
+over a pool of worker processes; every agent owns its own MQTT connection.
+
+Examples:
+    python load_test.py --agents 500 --duration 120
+    python load_test.py --embedded-broker --agents 2000 --processes 8 --publish-interval 10
+"""
+import argparse
+import asyncio
+import heapq
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from dotenv import load_dotenv
+
+from modules.sensor_config import SensorConfig
+from modules.data_collector import DataCollector
+from modules.mqtt_publisher import MQTTPublisher
+from modules.publish_scheduler import PublishScheduler
+
+# Load environment variables
+load_dotenv()
+
+# MQTT Configuration
+MQTT_BROKER = os.getenv('MQTT_BROKER', 'localhost')
+MQTT_PORT = int(os.getenv('MQTT_PORT', '1883'))
+MQTT_USERNAME = os.getenv('MQTT_USERNAME', '')
+MQTT_PASSWORD = os.getenv('MQTT_PASSWORD', '')
+
+
+class SyntheticDataCollector(DataCollector):
+    """DataCollector fed with random walk samples instead of psutil readings"""
+
+    def __init__(self, collection_interval=1, publish_interval=30, disk_count=2, cpu_breakdown=True):
+        super().__init__(collection_interval, publish_interval, hardware_sensor_interval=0,
+                         cgroup_metrics="false", cpu_breakdown=cpu_breakdown)
+        self.disk_count = disk_count
+        self.started = time.time()
+        self.cpu = random.uniform(5, 40)
+        self.memory = random.uniform(30, 70)
+
+    def get_system_info(self):
+        """Get synthetic system information in the same shape as the real collector"""
+        self.cpu = round(min(100.0, max(0.0, self.cpu + random.uniform(-5, 5))), 1)
+        self.memory = round(min(100.0, max(0.0, self.memory + random.uniform(-1, 1))), 1)
+
+        for index in range(self.disk_count):
+            drive = f"{chr(ord('C') + index)}:\\"
+            drive_key = drive.replace(':', '').replace('\\', '')
+            self.system_data["metrics"]["disk"][f"disk_{drive_key}"] = {
+                "state": 42.0,
+                "attributes": {
+                    "partition": drive,
+                    "name": "NTFS",
+                    "device": drive,
+                    "total_gb": 476.34,
+                    "used_gb": 200.06,
+                    "free_gb": 276.28
+                }
+            }
+
+        uptime = round(time.time() - self.started, 2)
+        self.system_data.update({
+            "timestamp": round(time.time(), 2),
+            "uptime": {
+                "seconds": uptime,
+                "formatted": time.strftime("%H:%M:%S", time.gmtime(uptime))
+            }
+        })
+
+        # Split the total like a VM would report it, for the breakdown sensors
+        # this host's CpuAccounting supports
+        iowait = round(random.uniform(0, 2), 1)
+        steal = round(random.uniform(0, 1), 1)
+        user = round(self.cpu * 0.7, 1)
+        cpu_times = {
+            "cpu_user": user,
+            "cpu_system": round(max(0.0, self.cpu - user - steal), 1),
+            "cpu_iowait": iowait,
+            "cpu_steal": steal
+        }
+
+        return {
+            "cpu_percent": self.cpu,
+            "memory_percent": self.memory,
+            "cpu_times": {key: cpu_times[key] for key in self.cpu_time_samples},
+            "uptime": uptime
+        }
+
+
+class LoadStats:
+    """Thread-safe counters collected inside a worker process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.bytes = 0
+        self.connect_failures = 0
+        self.connect_times = []
+        self.publish_latencies = []
+        self.cycle_times = []
+        # Counted from the end of the connect phase to the deadline, for the rates
+        self.window_messages = 0
+        self.window_bytes = 0
+        self.in_window = False
+
+    def record_publish(self, topic, payload):
+        size = len(topic) + (len(payload) if payload else 0)
+        with self.lock:
+            self.messages += 1
+            self.bytes += size
+            if self.in_window:
+                self.window_messages += 1
+                self.window_bytes += size
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "messages": self.messages,
+                "bytes": self.bytes,
+                "connect_failures": self.connect_failures,
+                "connect_times": list(self.connect_times),
+                "publish_latencies": list(self.publish_latencies),
+                "cycle_times": list(self.cycle_times),
+                "window_messages": self.window_messages,
+                "window_bytes": self.window_bytes,
+            }
+
+
+class CountingClient:
+    """Proxy around an MQTT client that records message counts, bytes and publish latency"""
+
+    def __init__(self, client, stats):
+        self._client = client
+        self._stats = stats
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._completed = {}
+        client.on_publish = self._on_publish
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        started = time.perf_counter()
+        info = self._client.publish(topic, payload, qos=qos, retain=retain)
+        self._stats.record_publish(topic, payload)
+        # on_publish may fire on the network thread before publish() returns
+        with self._lock:
+            completed = self._completed.pop(info.mid, None)
+            if completed is None:
+                self._pending[info.mid] = started
+        if completed is not None:
+            with self._stats.lock:
+                self._stats.publish_latencies.append(completed - started)
+        return info
+
+    def _on_publish(self, client, userdata, mid):
+        now = time.perf_counter()
+        with self._lock:
+            started = self._pending.pop(mid, None)
+            if started is None:
+                self._completed[mid] = now
+        if started is not None:
+            with self._stats.lock:
+                self._stats.publish_latencies.append(now - started)
+
+
+class VirtualAgent:
+    """A single simulated ha-desk instance"""
+
+    def __init__(self, index, options, stats):
+        self.device_id = f"{options['id_prefix']}-{index:05d}"
+        self.device_name = f"Load Test {index:05d}"
+        self.stats = stats
+
+        self.raw_client = mqtt.Client(client_id=self.device_id)
+        if options['username'] and options['password']:
+            self.raw_client.username_pw_set(options['username'], options['password'])
+        self.raw_client.will_set(f"homeassistant/binary_sensor/{self.device_id}/availability", "offline", retain=True)
+        self.raw_client.on_connect = self._on_connect
+        self.client = CountingClient(self.raw_client, stats)
+
+        self.data_collector = SyntheticDataCollector(1, options['publish_interval'], options['disks'],
+                                                     options['cpu_breakdown'])
+        self.sensor_config = SensorConfig(self.device_name, self.device_id)
+        self.mqtt_publisher = MQTTPublisher(self.client, self.device_id, self.sensor_config)
+        # Same sensors as ha_desk.py registers
+        self.sensor_config.metrics.extend(self.data_collector.cpu_accounting.metrics.values())
+        self.mqtt_publisher.metrics.update(self.data_collector.cpu_accounting.metrics)
+        self.publish_scheduler = PublishScheduler(self.device_id, options['publish_interval'], 1, options['align'])
+        self.connect_started = 0
+
+    def connect(self, host, port):
+        self.connect_started = time.perf_counter()
+        try:
+            self.raw_client.connect(host, port, 60)
+            self.raw_client.loop_start()
+        except Exception as e:
+            print(f"{self.device_id}: failed to connect to MQTT broker: {e}")
+            with self.stats.lock:
+                self.stats.connect_failures += 1
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            with self.stats.lock:
+                self.stats.connect_failures += 1
+            return
+        with self.stats.lock:
+            self.stats.connect_times.append(time.perf_counter() - self.connect_started)
+        # Same sequence as ha_desk.on_connect
+        self.mqtt_publisher.publish_availability("online")
+        self.sensor_config.publish_configs(self.client)
+
+    def publish_cycle(self):
+        """Fill one window of samples and publish it like mqtt_publish_loop does"""
+        for _ in range(self.data_collector.max_samples):
+            self.data_collector.collect_metrics()
+        self.data_collector.calculate_statistics()
+        unified_data = self.data_collector.get_unified_data()
+
+        started = time.perf_counter()
+        self.mqtt_publisher.publish_system_info(
+            {"uptime": unified_data["uptime"]["seconds"]},
+            unified_data["metrics"]
+        )
+        with self.stats.lock:
+            self.stats.cycle_times.append(time.perf_counter() - started)
+
+    def stop(self):
+        try:
+            self.mqtt_publisher.publish_offline_status()
+            self.raw_client.disconnect()
+        except Exception as e:
+            print(f"{self.device_id}: error while disconnecting: {e}")
+        self.raw_client.loop_stop()
+
+
+def run_worker(indices, options):
+    """Run a batch of agents in one process and return their stats"""
+    stats = LoadStats()
+    agents = [VirtualAgent(index, options, stats) for index in indices]
+
+    ramp = options['ramp'] / max(1, len(agents))
+    for agent in agents:
+        agent.connect(options['host'], options['port'])
+        if ramp:
+            time.sleep(ramp)
+
+    started = time.time()
+    deadline = started + options['duration']
+    with stats.lock:
+        stats.in_window = True
+
+    # Every agent that connected at the same moment publishes at the same
+    # moment too, which reproduces the logon-wave burst pattern.
+    schedule = []
+    for position, agent in enumerate(agents):
+        if options['align']:
+            due = agent.publish_scheduler.next_slot(started)
+        else:
+            due = started + options['publish_interval']
+        heapq.heappush(schedule, (due, position))
+
+    while schedule:
+        due, position = heapq.heappop(schedule)
+        if due > deadline:
+            break
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        agent = agents[position]
+        if agent.raw_client.is_connected():
+            agent.publish_cycle()
+        heapq.heappush(schedule, (due + options['publish_interval'], position))
+
+    # Run for the full duration, the rates are per second of it
+    remaining = deadline - time.time()
+    if remaining > 0:
+        time.sleep(remaining)
+    with stats.lock:
+        stats.in_window = False
+
+    for agent in agents:
+        agent.stop()
+
+    return stats.as_dict()
+
+
+class EmbeddedBroker:
+    """Minimal MQTT 3.1.1 sink that acknowledges connections and counts publishes"""
+
+    def __init__(self, host='127.0.0.1', port=1883):
+        self.host = host
+        self.port = port
+        self.messages = 0
+        self.bytes = 0
+        self.connections = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_client, self.host, self.port, backlog=4096)
+        )
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle_client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(1)
+                packet_type = header[0] >> 4
+                flags = header[0] & 0x0F
+
+                # Remaining length is a variable length integer
+                remaining = 0
+                multiplier = 1
+                while True:
+                    encoded = (await reader.readexactly(1))[0]
+                    remaining += (encoded & 0x7F) * multiplier
+                    if not encoded & 0x80:
+                        break
+                    multiplier *= 128
+                body = await reader.readexactly(remaining) if remaining else b""
+
+                if packet_type == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif packet_type == 3:  # PUBLISH
+                    self.messages += 1
+                    self.bytes += remaining
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        topic_length = int.from_bytes(body[0:2], "big")
+                        packet_id = body[2 + topic_length:4 + topic_length]
+                        writer.write((b"\x40\x02" if qos == 1 else b"\x50\x02") + packet_id)
+                elif packet_type == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Get nearest-rank percentiles of a list of values"""
+    if not values:
+        return {f"p{point}": 0.0 for point in points}
+    ordered = sorted(values)
+    result = {}
+    for point in points:
+        rank = max(0, min(len(ordered) - 1, int(round(point / 100 * len(ordered))) - 1))
+        result[f"p{point}"] = ordered[rank]
+    result["max"] = ordered[-1]
+    return result
+
+
+def format_ms(summary):
+    return ", ".join(f"{key}={value * 1000:.2f}ms" for key, value in summary.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of ha-desk agents against an MQTT broker")
+    parser.add_argument("--agents", type=int, default=100, help="number of virtual agents (default: 100)")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="number of worker processes (default: CPU count - 1)")
+    parser.add_argument("--duration", type=float, default=120, help="test duration in seconds (default: 120)")
+    parser.add_argument("--publish-interval", type=int, default=30, help="publish interval in seconds (default: 30)")
+    parser.add_argument("--disks", type=int, default=2, help="synthetic disks per agent (default: 2)")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which each process connects its agents")
+    parser.add_argument("--align", action="store_true", help="use wall-clock aligned publish slots")
+    parser.add_argument("--embedded-broker", action="store_true", help="run a minimal in-process MQTT sink")
+    parser.add_argument("--host", default=MQTT_BROKER, help="MQTT broker address")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="MQTT broker port")
+    parser.add_argument("--no-cpu-breakdown", action="store_true",
+                        help="leave out the CPU user/system/iowait/steal sensors, like CPU_BREAKDOWN=false")
+    parser.add_argument("--id-prefix", default="loadtest", help="DEVICE_ID prefix for virtual agents")
+    args = parser.parse_args()
+
+    broker = None
+    if args.embedded_broker:
+        broker = EmbeddedBroker('127.0.0.1', args.port)
+        broker.start()
+        args.host = '127.0.0.1'
+        print(f"Embedded broker listening on {broker.host}:{broker.port}")
+
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "username": MQTT_USERNAME,
+        "password": MQTT_PASSWORD,
+        "duration": args.duration,
+        "publish_interval": args.publish_interval,
+        "disks": args.disks,
+        "ramp": args.ramp,
+        "align": args.align,
+        "id_prefix": args.id_prefix,
+        "cpu_breakdown": not args.no_cpu_breakdown,
+    }
+
+    processes = max(1, min(args.processes, args.agents))
+    batches = [list(range(worker, args.agents, processes)) for worker in range(processes)]
+
+    print(f"Starting {args.agents} agents in {processes} processes against {args.host}:{args.port} "
+          f"for {args.duration:.0f}s (publish interval {args.publish_interval}s)")
+    started = time.time()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(run_worker, [(batch, options) for batch in batches])
+    elapsed = time.time() - started
+
+    merged = {
+        "messages": sum(result["messages"] for result in results),
+        "bytes": sum(result["bytes"] for result in results),
+        "connect_failures": sum(result["connect_failures"] for result in results),
+        "connect_times": [value for result in results for value in result["connect_times"]],
+        "publish_latencies": [value for result in results for value in result["publish_latencies"]],
+        "cycle_times": [value for result in results for value in result["cycle_times"]],
+        "window_messages": sum(result["window_messages"] for result in results),
+        "window_bytes": sum(result["window_bytes"] for result in results),
+    }
+
+    print()
+    print("Results")
+    print(f"  Elapsed:            {elapsed:.1f}s")
+    print(f"  Connected agents:   {len(merged['connect_times'])}/{args.agents} "
+          f"({merged['connect_failures']} failures)")
+    # Every worker publishes for exactly --duration after its agents connected,
+    # so pool start-up and the connect ramp do not dilute the rates
+    print(f"  Messages:           {merged['messages']} "
+          f"({merged['window_messages'] / args.duration:.1f} msg/s after connect)")
+    print(f"  Bytes (topic+body): {merged['bytes']} "
+          f"({merged['window_bytes'] / args.duration:.1f} B/s after connect)")
+    print(f"  Connect time:       {format_ms(percentiles(merged['connect_times']))}")
+    print(f"  Publish latency:    {format_ms(percentiles(merged['publish_latencies']))}")
+    print(f"  Publish cycle time: {format_ms(percentiles(merged['cycle_times']))}")
+    if merged['cycle_times']:
+        print(f"  Messages per cycle: {merged['messages'] / len(merged['cycle_times']):.1f} "
+              "(including connect-time configs)")
+
+    if broker:
+        print(f"  Broker received:    {broker.messages} messages, {broker.bytes} bytes "
+              f"over {broker.connections} connections")
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
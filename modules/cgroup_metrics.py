@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CgroupCollector:
+    """CPU, memory and pressure metrics relative to the agent's cgroup v2 limits.
+
+    Inside a container or a systemd slice psutil reports host-wide numbers.
+    These readings are relative to the cgroup's own quota instead: CPU usage
+    against cpu.max, memory against memory.max and PSI stall percentages.
+    """
+
+    # Metric key -> sensor name, published like the CPU and memory sensors
+    METRICS = {
+        "container_cpu": "Container CPU Usage",
+        "container_memory": "Container Memory Usage",
+        "cpu_pressure": "CPU Pressure",
+        "memory_pressure": "Memory Pressure",
+        "io_pressure": "IO Pressure"
+    }
+
+    def __init__(self, cgroup_root="/sys/fs/cgroup"):
+        self.cgroup_root = cgroup_root
+        self.path = self._find_cgroup_path()
+        self.last_usage_usec = None
+        self.last_time = None
+
+    def _find_cgroup_path(self):
+        """Find this process's cgroup v2 directory"""
+        try:
+            with open("/proc/self/cgroup") as f:
+                for line in f:
+                    # cgroup v2 entries look like "0::/system.slice/ha-desk.service"
+                    if line.startswith("0::"):
+                        path = os.path.join(self.cgroup_root, line[3:].strip().lstrip("/"))
+                        if os.path.exists(os.path.join(path, "cpu.stat")):
+                            return path
+        except OSError:
+            pass
+        # With a private cgroup namespace the container's cgroup is the root
+        if os.path.exists(os.path.join(self.cgroup_root, "cgroup.controllers")):
+            return self.cgroup_root
+        return None
+
+    def _read(self, name):
+        with open(os.path.join(self.path, name)) as f:
+            return f.read().strip()
+
+    def _read_keyed(self, name):
+        """Read a flat keyed file like cpu.stat or memory.stat"""
+        values = {}
+        for line in self._read(name).splitlines():
+            key, _, value = line.partition(" ")
+            values[key] = int(value)
+        return values
+
+    def available(self):
+        return self.path is not None
+
+    def cpu_limit(self):
+        """Get the CPU quota in cores, or None when unlimited"""
+        try:
+            quota, period = self._read("cpu.max").split()
+        except (OSError, ValueError):
+            return None
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+
+    def memory_limit(self):
+        """Get the memory limit in bytes, or None when unlimited"""
+        try:
+            limit = self._read("memory.max")
+        except OSError:
+            return None
+        return None if limit == "max" else int(limit)
+
+    def is_limited(self):
+        """Check whether this cgroup has a CPU quota or memory limit"""
+        return self.available() and (self.cpu_limit() is not None or self.memory_limit() is not None)
+
+    def _pressure(self, name):
+        """Get the 'some' avg10 stall percentage from a PSI file"""
+        try:
+            for line in self._read(name).splitlines():
+                if line.startswith("some "):
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+        except (OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def _host_cores():
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+    def _cpu_percent(self):
+        """Get CPU usage since the previous call as a percentage of the quota"""
+        usage_usec = self._read_keyed("cpu.stat")["usage_usec"]
+        now = time.monotonic()
+        percent = None
+        if self.last_usage_usec is not None and now > self.last_time:
+            cores = self.cpu_limit() or self._host_cores()
+            elapsed_usec = (now - self.last_time) * 1000000
+            percent = round(min(100.0, (usage_usec - self.last_usage_usec) / (elapsed_usec * cores) * 100), 1)
+        self.last_usage_usec = usage_usec
+        self.last_time = now
+        return percent
+
+    def _memory_percent(self, host_total):
+        """Get the working set as a percentage of the memory limit"""
+        current = int(self._read("memory.current"))
+        try:
+            # Page cache that can be reclaimed does not count against the limit
+            current -= self._read_keyed("memory.stat").get("inactive_file", 0)
+        except (OSError, ValueError):
+            pass
+        limit = self.memory_limit() or host_total
+        return round(max(0, current) / limit * 100, 1) if limit else None
+
+    def collect(self, host_memory_total):
+        """Read all cgroup metrics, skipping any that are not available yet"""
+        values = {}
+        try:
+            values["container_cpu"] = self._cpu_percent()
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"Could not read cgroup CPU usage: {e}")
+        try:
+            values["container_memory"] = self._memory_percent(host_memory_total)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read cgroup memory usage: {e}")
+        values["cpu_pressure"] = self._pressure("cpu.pressure")
+        values["memory_pressure"] = self._pressure("memory.pressure")
+        values["io_pressure"] = self._pressure("io.pressure")
+        return {key: value for key, value in values.items() if value is not None}
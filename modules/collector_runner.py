@@ -0,0 +1,111 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+class CollectorRunner:
+    """Runs slow collectors in a bounded thread pool, each with its own deadline.
+
+    A collector that misses its deadline keeps its last good value, is marked
+    stale and is quarantined with exponential backoff. Python threads cannot
+    be cancelled, so a hung collector is never resubmitted while its previous
+    call is still running; a late result is picked up once it finishes. Each
+    hung call keeps its worker thread, so the pool has room for max_hung of
+    them on top of max_workers before healthy collectors queue behind them.
+    """
+
+    def __init__(self, max_workers=4, timeout=0.5, base_backoff=1, max_backoff=300, max_hung=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers + max_hung, thread_name_prefix="collector")
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.collectors = {}
+
+    def register(self, name, func, timeout=None):
+        """Register a collector function returning its latest value"""
+        self.collectors[name] = {
+            "func": func,
+            "timeout": timeout if timeout is not None else self.timeout,
+            "future": None,
+            "value": None,
+            "stale": True,
+            "last_success": 0,
+            "failures": 0,
+            "quarantined_until": 0
+        }
+
+    def unregister(self, name):
+        """Drop a collector, a call that is still running is abandoned"""
+        self.collectors.pop(name, None)
+
+    def _harvest(self, name, state):
+        """Pick up the result of a call that finished after its deadline"""
+        future = state["future"]
+        state["future"] = None
+        try:
+            state["value"] = future.result()
+            state["last_success"] = time.time()
+            logger.info(f"Collector {name} finished late, keeping its result")
+        except Exception as e:
+            logger.warning(f"Collector {name} failed after its deadline: {e}")
+
+    def _fail(self, name, state, reason, now):
+        state["stale"] = True
+        state["failures"] += 1
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (state["failures"] - 1))
+        state["quarantined_until"] = now + backoff
+        logger.warning(f"Collector {name} {reason}, quarantined for {backoff}s "
+                       f"({state['failures']} consecutive failures)")
+
+    def run_all(self, names=None):
+        """Run every due collector (or only names) concurrently and return the latest value of each"""
+        now = time.time()
+        started = time.monotonic()
+        submitted = []
+
+        for name, state in self.collectors.items():
+            if names is not None and name not in names:
+                continue
+            if state["future"] is not None:
+                if not state["future"].done():
+                    # Still hung from an earlier tick
+                    state["stale"] = True
+                    continue
+                self._harvest(name, state)
+            if state["quarantined_until"] > now:
+                state["stale"] = True
+                continue
+            state["future"] = self.executor.submit(state["func"])
+            submitted.append(name)
+
+        for name in submitted:
+            state = self.collectors[name]
+            remaining = state["timeout"] - (time.monotonic() - started)
+            try:
+                state["value"] = state["future"].result(timeout=max(0, remaining))
+            except TimeoutError:
+                self._fail(name, state, f"timed out after {state['timeout']}s", now)
+                continue
+            except Exception as e:
+                state["future"] = None
+                self._fail(name, state, f"failed: {e}", now)
+                continue
+            state["future"] = None
+            state["stale"] = False
+            state["failures"] = 0
+            state["last_success"] = time.time()
+
+        return {name: state["value"] for name, state in self.collectors.items()}
+
+    def status(self):
+        """Get staleness and quarantine information for every collector"""
+        return {
+            name: {
+                "stale": state["stale"],
+                "last_success": round(state["last_success"], 2),
+                "failures": state["failures"],
+                "quarantined_until": round(state["quarantined_until"], 2)
+            }
+            for name, state in self.collectors.items()
+        }
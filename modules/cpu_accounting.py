@@ -0,0 +1,94 @@
+import logging
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+class CpuAccounting:
+    """CPU utilization from psutil.cpu_times() deltas between collection ticks.
+
+    psutil.cpu_percent() without an interval reports usage since whichever
+    caller ran it last and returns 0 on the first call. Here every tick takes
+    its own snapshot, so each reading covers exactly the interval since the
+    previous tick, and a publish window covers exactly its own ticks. The
+    first tick only takes the baseline and has no reading.
+    """
+
+    # Metric key -> sensor name for the breakdown, published like the CPU sensor
+    METRICS = {
+        "cpu_user": "CPU User",
+        "cpu_system": "CPU System",
+        "cpu_iowait": "CPU IO Wait",
+        "cpu_steal": "CPU Steal"
+    }
+
+    # cpu_times() fields behind each breakdown metric. Whatever is busy but not
+    # user or steal (system, irq, softirq, interrupt, dpc) counts as system.
+    USER_FIELDS = ("user", "nice")
+    IDLE_FIELDS = ("idle", "iowait")
+    # On Linux guest time is already included in user and nice
+    GUEST_FIELDS = ("guest", "guest_nice")
+
+    def __init__(self, breakdown=True):
+        # Set on the first tick, a baseline taken at startup would give that
+        # tick an interval of a few milliseconds and a 0 or quantised reading
+        self.last = None
+        self.window_start = None
+
+        # iowait and steal only exist on Linux; without the breakdown only
+        # the total is measured
+        fields = psutil.cpu_times()._fields if breakdown else ()
+        self.metrics = {key: name for key, name in self.METRICS.items() if key[4:] in fields}
+        self.usage = {"cpu": 0.0}
+        for key in self.metrics:
+            self.usage[key] = 0.0
+
+    def _usage(self, before, after, usage):
+        """Write utilization percentages between two cpu_times() snapshots into usage"""
+        deltas = {}
+        for field in after._fields:
+            # Counters can step back slightly on some kernels, treat that as no time
+            deltas[field] = max(0.0, getattr(after, field) - getattr(before, field))
+
+        total = sum(deltas.values()) - sum(deltas.get(field, 0.0) for field in self.GUEST_FIELDS)
+        if total <= 0:
+            # Less than one clock tick passed, keep the previous reading
+            return usage
+
+        idle = sum(deltas.get(field, 0.0) for field in self.IDLE_FIELDS)
+        user = sum(deltas.get(field, 0.0) for field in self.USER_FIELDS)
+        steal = deltas.get("steal", 0.0)
+        busy = max(0.0, total - idle)
+
+        usage["cpu"] = round(busy / total * 100, 1)
+        if "cpu_user" in self.metrics:
+            usage["cpu_user"] = round(user / total * 100, 1)
+        if "cpu_system" in self.metrics:
+            usage["cpu_system"] = round(max(0.0, busy - user - steal) / total * 100, 1)
+        if "cpu_iowait" in self.metrics:
+            usage["cpu_iowait"] = round(deltas["iowait"] / total * 100, 1)
+        if "cpu_steal" in self.metrics:
+            usage["cpu_steal"] = round(steal / total * 100, 1)
+        return usage
+
+    def sample(self):
+        """Take a snapshot for this tick and get the utilization since the previous one.
+
+        Returns None on the first tick, which only takes the baseline. The
+        returned dict is updated in place on every call.
+        """
+        current = psutil.cpu_times()
+        if self.last is None:
+            self.last = self.window_start = current
+            return None
+        self._usage(self.last, current, self.usage)
+        self.last = current
+        return self.usage
+
+    def close_window(self):
+        """Get the utilization over all ticks since the previous call, or None without ticks"""
+        if self.last is self.window_start:
+            return None
+        usage = self._usage(self.window_start, self.last, {})
+        self.window_start = self.last
+        return usage or None
@@ -5,19 +5,64 @@ from statistics import mean
 import logging
 import sys
 import platform
+from functools import partial
+
+from modules.hardware_sensors import HardwareSensorCollector
+from modules.collector_runner import CollectorRunner
+from modules.cgroup_metrics import CgroupCollector
+from modules.cpu_accounting import CpuAccounting
+from modules.sample_window import SampleWindow
 
 logger = logging.getLogger(__name__)
 
 class DataCollector:
-    def __init__(self, collection_interval=1, publish_interval=30):
+    def __init__(self, collection_interval=1, publish_interval=30, hardware_sensor_interval=10,
+                 collector_timeout=0.5, cgroup_metrics="auto", low_footprint=False, cpu_breakdown=True):
         self.collection_interval = collection_interval
         self.publish_interval = publish_interval
         self.max_samples = publish_interval // collection_interval
         self.is_windows = platform.system().lower() == 'windows'
+
+        # Low-footprint mode keeps samples in arrays, updates the unified data
+        # in place and probes disks and hardware once per publish window
+        self.low_footprint = low_footprint
+        self.ticks = 0
+        sample_store = SampleWindow if low_footprint else (lambda size: deque(maxlen=size))
         
         # Initialize data collection queues
-        self.cpu_samples = deque(maxlen=self.max_samples)
-        self.memory_samples = deque(maxlen=self.max_samples)
+        self.cpu_samples = sample_store(self.max_samples)
+        self.memory_samples = sample_store(self.max_samples)
+
+        # CPU usage from cpu_times() deltas between ticks, with an optional breakdown
+        self.cpu_accounting = CpuAccounting(cpu_breakdown)
+        self.cpu_time_samples = {key: sample_store(self.max_samples) for key in self.cpu_accounting.metrics}
+
+        # Quota-relative metrics when running in a container or systemd slice.
+        # "auto" enables them only when the cgroup has a CPU or memory limit.
+        self.cgroup = None
+        self.cgroup_samples = {}
+        if cgroup_metrics in ("auto", "true") and not self.is_windows:
+            cgroup = CgroupCollector()
+            if cgroup.available() and (cgroup_metrics == "true" or cgroup.is_limited()):
+                self.cgroup = cgroup
+                self.cgroup_samples = {key: sample_store(self.max_samples) for key in CgroupCollector.METRICS}
+                logger.info(f"Collecting cgroup metrics from {cgroup.path}")
+
+        # Temperature, fan and battery sensors are read at a slower interval
+        self.hardware_sensors = None
+        if hardware_sensor_interval:
+            self.hardware_sensors = HardwareSensorCollector(hardware_sensor_interval)
+
+        # Disk and hardware probes can hang (stale network mounts, hwmon), so
+        # they run in a worker pool with deadlines instead of on this thread
+        self.collector_runner = CollectorRunner(max_workers=2 if low_footprint else 4, timeout=collector_timeout,
+                                                base_backoff=collection_interval)
+        # Disks are listed by one cheap probe and each one's usage is read by
+        # its own collector, so one stale network mount only stalls itself
+        self.disk_collectors = {}
+        self.collector_runner.register("disks", self._list_disks)
+        if self.hardware_sensors:
+            self.collector_runner.register("hardware", self.hardware_sensors.read)
         
         # Initialize the unified data structure
         self.system_data = {
@@ -26,115 +71,196 @@ class DataCollector:
             "metrics": {
                 "cpu": {"current": 0, "min": 0, "max": 0, "avg": 0},
                 "memory": {"current": 0, "min": 0, "max": 0, "avg": 0},
-                "disk": {}  # Will be populated with disk information
+                "disk": {},  # Will be populated with disk information
+                "temperature": {},
+                "fan": {},
+                "battery": {}
             },
             "uptime": {
                 "seconds": 0,
                 "formatted": "00:00:00"
-            }
+            },
+            "collectors": {}
         }
+        for key in list(self.cpu_time_samples) + list(self.cgroup_samples):
+            self.system_data["metrics"][key] = {"current": 0, "min": 0, "max": 0, "avg": 0}
 
-    def get_windows_disk_info(self):
-        """Get disk information specifically for Windows systems"""
-        try:
-            import win32api
-            import win32file
-            
-            drives = []
-            bitmask = win32api.GetLogicalDrives()
-            for letter in range(65, 91):  # A-Z
-                if bitmask & 1:
-                    drive = f"{chr(letter)}:\\"
-                    try:
-                        # Get drive type
-                        drive_type = win32file.GetDriveType(drive)
-                        # Skip non-fixed drives (removable, network, etc.)
-                        if drive_type == win32file.DRIVE_FIXED:
-                            drives.append(drive)
-                    except Exception as e:
-                        logger.debug(f"Could not get drive type for {drive}: {e}")
-                bitmask >>= 1
-            for drive in drives:
+        # Reused for every collect_metrics() result in low-footprint mode
+        self.system_info = {"cpu_percent": 0, "memory_percent": 0, "cpu_times": {}, "cgroup": {}, "uptime": 0}
+        # psutil re-reads /proc/stat on every boot_time() call
+        self.boot_time = psutil.boot_time() if low_footprint else None
+
+    def _get_windows_drives(self):
+        """Get the fixed drives on Windows, raising ImportError without pywin32"""
+        import win32api
+        import win32file
+
+        drives = []
+        bitmask = win32api.GetLogicalDrives()
+        for letter in range(65, 91):  # A-Z
+            if bitmask & 1:
+                drive = f"{chr(letter)}:\\"
                 try:
-                    # Get the disk free space
-                    sectors_per_cluster, bytes_per_sector, free_clusters, total_clusters = win32file.GetDiskFreeSpace(drive)
-                    
-                    # Convert to float to handle large numbers
-                    total_bytes = float(total_clusters) * float(sectors_per_cluster) * float(bytes_per_sector)
-                    free_space = float(free_clusters) * float(sectors_per_cluster) * float(bytes_per_sector)
-                    used_space = total_bytes - free_space
-                    percent_used = (used_space / total_bytes) * 100 if total_bytes > 0 else 0
-
-                    # Convert to GB for more compact representation
-                    total_gb = round(total_bytes / (1024**3), 2)
-                    used_gb = round(used_space / (1024**3), 2)
-                    free_gb = round(free_space / (1024**3), 2)
-
-                    # Create a unique key for each drive
-                    drive_key = drive.replace(':', '').replace('\\', '')
-                    self.system_data["metrics"]["disk"][f"disk_{drive_key}"] = {
-                        "state": round(percent_used, 2),
-                        "attributes": {
-                            "partition": drive,
-                            "name": "NTFS",
-                            "device": drive,
-                            "total_gb": total_gb,
-                            "used_gb": used_gb,
-                            "free_gb": free_gb
-                        }
-                    }
+                    # Get drive type
+                    drive_type = win32file.GetDriveType(drive)
+                    # Skip non-fixed drives (removable, network, etc.)
+                    if drive_type == win32file.DRIVE_FIXED:
+                        drives.append(drive)
                 except Exception as e:
-                    logger.warning(f"Could not get usage for drive {drive}: {e}")
-                    drive_key = drive.replace(':', '').replace('\\', '')
-                    self.system_data["metrics"]["disk"][f"disk_{drive_key}"] = {
-                        "state": 0,
-                        "attributes": {
-                            "partition": drive,
-                            "name": "Unknown",
-                            "device": drive,
-                            "total_gb": 0,
-                            "used_gb": 0,
-                            "free_gb": 0,
-                            "error": str(e)
-                        }
-                    }
-        except ImportError:
-            logger.error("win32api module not available. Falling back to psutil.")
-            self._get_disk_info_fallback()
-        except Exception as e:
-            logger.error(f"Error getting Windows disk information: {e}")
-            self._get_disk_info_fallback()
+                    logger.debug(f"Could not get drive type for {drive}: {e}")
+            bitmask >>= 1
+        return drives
+
+    @staticmethod
+    def _windows_drive_key(drive):
+        drive_key = drive.replace(':', '').replace('\\', '')
+        return f"disk_{drive_key}"
+
+    def _get_windows_drive_info(self, drive):
+        """Get usage information for one Windows drive"""
+        import win32file
 
-    def _get_disk_info_fallback(self):
-        """Fallback method for getting disk information using psutil"""
         try:
-            for partition in psutil.disk_partitions():
-                if partition.fstype and partition.fstype.lower() not in ['cdrom', 'dvd']:
-                    try:
-                        usage = psutil.disk_usage(partition.mountpoint)
-                        self.system_data["metrics"]["disk"][partition.mountpoint] = {
-                            "partition": partition.mountpoint,
-                            "name": partition.fstype,
-                            "device": partition.device,
-                            "current": usage.percent,
-                            "total": usage.total,
-                            "used": usage.used,
-                            "free": usage.free
-                        }
-                    except Exception as e:
-                        logger.warning(f"Could not get usage for {partition.mountpoint}: {e}")
+            # Get the disk free space
+            sectors_per_cluster, bytes_per_sector, free_clusters, total_clusters = win32file.GetDiskFreeSpace(drive)
+            
+            # Convert to float to handle large numbers
+            total_bytes = float(total_clusters) * float(sectors_per_cluster) * float(bytes_per_sector)
+            free_space = float(free_clusters) * float(sectors_per_cluster) * float(bytes_per_sector)
+            used_space = total_bytes - free_space
+            percent_used = (used_space / total_bytes) * 100 if total_bytes > 0 else 0
+
+            # Convert to GB for more compact representation
+            total_gb = round(total_bytes / (1024**3), 2)
+            used_gb = round(used_space / (1024**3), 2)
+            free_gb = round(free_space / (1024**3), 2)
+
+            return {
+                "state": round(percent_used, 2),
+                "attributes": {
+                    "partition": drive,
+                    "name": "NTFS",
+                    "device": drive,
+                    "total_gb": total_gb,
+                    "used_gb": used_gb,
+                    "free_gb": free_gb
+                }
+            }
         except Exception as e:
-            logger.error(f"Error in fallback disk information collection: {e}")
+            logger.warning(f"Could not get usage for drive {drive}: {e}")
+            return {
+                "state": 0,
+                "attributes": {
+                    "partition": drive,
+                    "name": "Unknown",
+                    "device": drive,
+                    "total_gb": 0,
+                    "used_gb": 0,
+                    "free_gb": 0,
+                    "error": str(e)
+                }
+            }
+
+    @staticmethod
+    def _get_partitions():
+        """Get the partitions psutil can report usage for"""
+        return [
+            partition for partition in psutil.disk_partitions()
+            if partition.fstype and partition.fstype.lower() not in ['cdrom', 'dvd']
+        ]
+
+    @staticmethod
+    def _get_partition_info(partition):
+        """Get usage information for one partition using psutil"""
+        usage = psutil.disk_usage(partition.mountpoint)
+        return {
+            "partition": partition.mountpoint,
+            "name": partition.fstype,
+            "device": partition.device,
+            "current": usage.percent,
+            "total": usage.total,
+            "used": usage.used,
+            "free": usage.free
+        }
+
+    def _list_disks(self):
+        """List the disks to probe as {collector name: (disk key, probe)}.
+
+        Listing only reads the mount table, the usage probes that can hang
+        on a stale network mount run as separate collectors.
+        """
+        if self.is_windows:
+            try:
+                return {
+                    f"disk:{drive}": (self._windows_drive_key(drive), partial(self._get_windows_drive_info, drive))
+                    for drive in self._get_windows_drives()
+                }
+            except ImportError:
+                logger.error("win32api module not available. Falling back to psutil.")
+            except Exception as e:
+                logger.error(f"Error getting Windows disk information: {e}")
+        return {
+            f"disk:{partition.mountpoint}": (partition.mountpoint, partial(self._get_partition_info, partition))
+            for partition in self._get_partitions()
+        }
+
+    def _sync_disk_collectors(self, disks):
+        """Register a collector per listed disk and drop removed ones, returning the new names"""
+        for name in list(self.disk_collectors):
+            if name not in disks:
+                self.collector_runner.unregister(name)
+                self.system_data["metrics"]["disk"].pop(self.disk_collectors.pop(name), None)
+        added = []
+        for name, (disk_key, probe) in disks.items():
+            if name not in self.disk_collectors:
+                self.collector_runner.register(name, probe)
+                self.disk_collectors[name] = disk_key
+                added.append(name)
+        return added
+
+    def _run_collectors(self):
+        """Run the disk and hardware probes and store their latest values"""
+        results = self.collector_runner.run_all()
+        if results.get("disks") is not None:
+            added = self._sync_disk_collectors(results["disks"])
+            if added:
+                # Probe newly listed disks right away instead of next round
+                results = self.collector_runner.run_all(added)
+
+        for name, disk_key in self.disk_collectors.items():
+            if results.get(name) is not None:
+                self.system_data["metrics"]["disk"][disk_key] = results[name]
+        if results.get("hardware"):
+            self.system_data["metrics"].update(results["hardware"])
+        self.system_data["collectors"] = self.collector_runner.status()
 
     def get_system_info(self):
         """Get current system information"""
-        uptime = round(time.time() - psutil.boot_time(), 2)
+        uptime = round(time.time() - (self.boot_time or psutil.boot_time()), 2)
         
-        # Get disk information based on platform
-        if self.is_windows:
-            self.get_windows_disk_info()
-        else:
-            self._get_disk_info_fallback()
+        # Run disk and hardware probes in the worker pool; a probe that misses
+        # its deadline keeps its last good value and is flagged stale
+        if not self.low_footprint or self.ticks % self.max_samples == 0:
+            self._run_collectors()
+        self.ticks += 1
+
+        memory = psutil.virtual_memory()
+        # None on the first tick, which only sets the cpu_times() baseline
+        cpu_usage = self.cpu_accounting.sample()
+        cpu_percent = cpu_usage["cpu"] if cpu_usage else None
+        cgroup_values = self.cgroup.collect(memory.total) if self.cgroup else {}
+
+        if self.low_footprint:
+            self.system_data["timestamp"] = round(time.time(), 2)
+            self.system_data["uptime"]["seconds"] = uptime
+            self.system_data["uptime"]["formatted"] = time.strftime("%H:%M:%S", time.gmtime(uptime))
+            system_info = self.system_info
+            system_info["cpu_percent"] = cpu_percent
+            system_info["memory_percent"] = memory.percent
+            system_info["cpu_times"] = cpu_usage or {}
+            system_info["cgroup"] = cgroup_values
+            system_info["uptime"] = uptime
+            return system_info
         
         # Update the unified data structure
         self.system_data.update({
@@ -146,8 +272,10 @@ class DataCollector:
         })
         
         return {
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
+            "cpu_percent": cpu_percent,
+            "memory_percent": memory.percent,
+            "cpu_times": {key: value for key, value in (cpu_usage or {}).items() if key != "cpu"},
+            "cgroup": cgroup_values,
             "uptime": uptime
         }
 
@@ -155,17 +283,47 @@ class DataCollector:
         """Collect system metrics and update the unified data structure"""
         system_info = self.get_system_info()
         
-        # Update samples
-        self.cpu_samples.append(system_info["cpu_percent"])
+        # Update samples and current values in the unified data structure;
+        # the first tick has no CPU reading yet
+        if system_info["cpu_percent"] is not None:
+            self.cpu_samples.append(system_info["cpu_percent"])
+            self.system_data["metrics"]["cpu"]["current"] = system_info["cpu_percent"]
         self.memory_samples.append(system_info["memory_percent"])
-        
-        # Update current values in the unified data structure
-        self.system_data["metrics"]["cpu"]["current"] = system_info["cpu_percent"]
         self.system_data["metrics"]["memory"]["current"] = system_info["memory_percent"]
+
+        for key in self.cpu_time_samples:
+            if key in system_info.get("cpu_times", {}):
+                value = system_info["cpu_times"][key]
+                self.cpu_time_samples[key].append(value)
+                self.system_data["metrics"][key]["current"] = value
+
+        for key, value in system_info.get("cgroup", {}).items():
+            self.cgroup_samples[key].append(value)
+            self.system_data["metrics"][key]["current"] = value
         
-        logger.debug(f"Collected metrics - CPU: {system_info['cpu_percent']}%, Memory: {system_info['memory_percent']}%")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Collected metrics - CPU: {system_info['cpu_percent']}%, Memory: {system_info['memory_percent']}%")
         return system_info
 
+    @staticmethod
+    def _sample_statistics(samples):
+        """Get current, min, max and avg for a window of samples"""
+        return {
+            "current": float(samples[-1]) if samples else 0.0,
+            "min": float(min(samples)) if samples else 0.0,
+            "max": float(max(samples)) if samples else 0.0,
+            "avg": float(round(mean(samples), 2)) if samples else 0.0
+        }
+
+    @staticmethod
+    def _apply_cpu_window(stats, cpu_window):
+        """Use the window's cpu_times() delta as the CPU averages"""
+        if not cpu_window:
+            return
+        for key, value in cpu_window.items():
+            if key in stats:
+                stats[key]["avg"] = value
+
     def calculate_statistics(self):
         """Calculate statistics for all metrics and update the unified data structure"""
         # Ensure we have samples before calculating
@@ -173,26 +331,38 @@ class DataCollector:
             logger.warning("No samples available for statistics calculation")
             return self.system_data["metrics"]
 
+        # The window average comes from the cpu_times() delta across the whole
+        # window, so late or skipped ticks are weighted by their actual length
+        cpu_window = self.cpu_accounting.close_window()
+
+        if self.low_footprint:
+            metrics = self.system_data["metrics"]
+            self.cpu_samples.fill_statistics(metrics["cpu"])
+            self.memory_samples.fill_statistics(metrics["memory"])
+            for key, samples in self.cpu_time_samples.items():
+                samples.fill_statistics(metrics[key])
+            for key, samples in self.cgroup_samples.items():
+                samples.fill_statistics(metrics[key])
+            self._apply_cpu_window(metrics, cpu_window)
+            return metrics
+
         stats = {
-            "cpu": {
-                "current": float(self.cpu_samples[-1]) if self.cpu_samples else 0.0,
-                "min": float(min(self.cpu_samples)) if self.cpu_samples else 0.0,
-                "max": float(max(self.cpu_samples)) if self.cpu_samples else 0.0,
-                "avg": float(round(mean(self.cpu_samples), 2)) if self.cpu_samples else 0.0
-            },
-            "memory": {
-                "current": float(self.memory_samples[-1]) if self.memory_samples else 0.0,
-                "min": float(min(self.memory_samples)) if self.memory_samples else 0.0,
-                "max": float(max(self.memory_samples)) if self.memory_samples else 0.0,
-                "avg": float(round(mean(self.memory_samples), 2)) if self.memory_samples else 0.0
-            }
+            "cpu": self._sample_statistics(self.cpu_samples),
+            "memory": self._sample_statistics(self.memory_samples)
         }
-        stats["disk"] = self.system_data["metrics"]["disk"]
+        for key, samples in self.cpu_time_samples.items():
+            stats[key] = self._sample_statistics(samples)
+        for key, samples in self.cgroup_samples.items():
+            stats[key] = self._sample_statistics(samples)
+        self._apply_cpu_window(stats, cpu_window)
+        for key in ["disk", "temperature", "fan", "battery"]:
+            stats[key] = self.system_data["metrics"][key]
         
         # Update statistics in the unified data structure
         self.system_data["metrics"] = stats
         
-        logger.debug(f"Calculated statistics: {stats}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Calculated statistics: {stats}")
         return stats
 
     def get_unified_data(self):
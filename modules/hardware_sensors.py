@@ -0,0 +1,206 @@
+import psutil
+import time
+import glob
+import os
+import re
+import logging
+import platform
+
+logger = logging.getLogger(__name__)
+
+class HardwareSensorCollector:
+    """Temperature, fan and battery readings with cached capability discovery.
+
+    Discovering sensors can take seconds on hwmon-heavy Linux machines, so it
+    happens once. On Linux the discovered sysfs files are read directly;
+    elsewhere psutil is queried and filtered to the discovered sensors.
+    """
+
+    def __init__(self, read_interval=10, hwmon_root="/sys/class/hwmon"):
+        self.read_interval = read_interval
+        self.hwmon_root = hwmon_root
+        self.use_sysfs = platform.system().lower() == 'linux' and os.path.isdir(hwmon_root)
+
+        self.discovered = False
+        self.last_read = 0
+        # sensor key -> {"chip", "label", "path"}
+        self.temperature_sensors = {}
+        self.fan_sensors = {}
+        self.has_battery = False
+
+        self.readings = {
+            "temperature": {},
+            "fan": {},
+            "battery": {}
+        }
+
+    @staticmethod
+    def _sensor_key(prefix, chip, label):
+        return f"{prefix}_" + re.sub(r'[^a-z0-9]+', '_', f"{chip}_{label}".lower()).strip('_')
+
+    @staticmethod
+    def _read_sysfs(path):
+        with open(path) as f:
+            return f.read().strip()
+
+    @staticmethod
+    def _device_id(hwmon_dir):
+        """Get a stable name for the device behind a hwmon directory.
+
+        hwmonN indexes can change between boots, the device link target does
+        not. Prefers the PCI address, e.g. 0000:3d:00.0 for an NVMe drive.
+        """
+        device_path = os.path.realpath(os.path.join(hwmon_dir, 'device'))
+        if device_path == os.path.realpath(hwmon_dir):
+            return None
+        parts = [part for part in device_path.split(os.sep) if part]
+        for part in reversed(parts):
+            if re.fullmatch(r'[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-9a-f]', part):
+                return part
+        return parts[-1] if parts else None
+
+    def _discover_sysfs(self, kind, prefix):
+        """Find readable hwmon input files of one kind (temp or fan)"""
+        sensors = {}
+        chips = []
+        for hwmon_dir in sorted(glob.glob(os.path.join(self.hwmon_root, 'hwmon*'))):
+            try:
+                chip = self._read_sysfs(os.path.join(hwmon_dir, 'name'))
+            except OSError:
+                chip = os.path.basename(hwmon_dir)
+            chips.append((hwmon_dir, chip))
+
+        chip_names = [chip for _, chip in chips]
+        for hwmon_dir, chip in chips:
+            if chip_names.count(chip) > 1:
+                # Several chips of the same type, e.g. two nvme drives, are told
+                # apart by their device; the hwmonN index is a last resort
+                chip = f"{chip} {self._device_id(hwmon_dir) or os.path.basename(hwmon_dir)}"
+
+            inputs = glob.glob(os.path.join(hwmon_dir, f'{kind}*_input'))
+            inputs += glob.glob(os.path.join(hwmon_dir, 'device', f'{kind}*_input'))
+            for input_path in sorted(inputs):
+                base = input_path[:-len('_input')]
+                try:
+                    label = self._read_sysfs(f"{base}_label")
+                except OSError:
+                    label = os.path.basename(base)
+                try:
+                    # Skip inputs that exist but cannot be read
+                    int(self._read_sysfs(input_path))
+                except (OSError, ValueError):
+                    continue
+                sensors[self._sensor_key(prefix, chip, label)] = {
+                    "chip": chip,
+                    "label": label,
+                    "path": input_path
+                }
+        return sensors
+
+    def _discover_psutil(self, function_name, prefix):
+        """Find sensors reported by a psutil sensors_* function"""
+        sensors = {}
+        if not hasattr(psutil, function_name):
+            return sensors
+        try:
+            for chip, entries in getattr(psutil, function_name)().items():
+                for index, entry in enumerate(entries):
+                    label = entry.label or f"{prefix}{index + 1}"
+                    sensors[self._sensor_key(prefix, chip, label)] = {
+                        "chip": chip,
+                        "label": label,
+                        "path": None
+                    }
+        except Exception as e:
+            logger.warning(f"Could not discover sensors via psutil.{function_name}: {e}")
+        return sensors
+
+    def discover(self):
+        """Discover available temperature, fan and battery sensors once"""
+        started = time.time()
+        if self.use_sysfs:
+            self.temperature_sensors = self._discover_sysfs('temp', 'temp')
+            self.fan_sensors = self._discover_sysfs('fan', 'fan')
+        else:
+            self.temperature_sensors = self._discover_psutil('sensors_temperatures', 'temp')
+            self.fan_sensors = self._discover_psutil('sensors_fans', 'fan')
+
+        try:
+            self.has_battery = hasattr(psutil, 'sensors_battery') and psutil.sensors_battery() is not None
+        except Exception as e:
+            logger.warning(f"Could not discover battery: {e}")
+            self.has_battery = False
+
+        self.discovered = True
+        logger.info(f"Discovered {len(self.temperature_sensors)} temperature sensors, "
+                    f"{len(self.fan_sensors)} fans, battery: {self.has_battery} "
+                    f"in {time.time() - started:.2f}s")
+
+    def _read_sysfs_sensors(self, sensors, scale):
+        values = {}
+        for key, sensor in sensors.items():
+            try:
+                values[key] = int(self._read_sysfs(sensor["path"])) / scale
+            except (OSError, ValueError) as e:
+                logger.debug(f"Could not read {sensor['path']}: {e}")
+        return values
+
+    def _read_psutil_sensors(self, function_name, prefix, sensors):
+        values = {}
+        try:
+            for chip, entries in getattr(psutil, function_name)().items():
+                for index, entry in enumerate(entries):
+                    key = self._sensor_key(prefix, chip, entry.label or f"{prefix}{index + 1}")
+                    if key in sensors:
+                        values[key] = entry.current
+        except Exception as e:
+            logger.debug(f"Could not read psutil.{function_name}: {e}")
+        return values
+
+    def _update_readings(self, kind, sensors, values):
+        for key, value in values.items():
+            self.readings[kind][key] = {
+                "state": round(value, 1),
+                "attributes": {
+                    "chip": sensors[key]["chip"],
+                    "label": sensors[key]["label"]
+                }
+            }
+
+    def _snapshot(self):
+        # Callers may read from another thread while the next read runs
+        return {kind: dict(values) for kind, values in self.readings.items()}
+
+    def read(self, force=False):
+        """Read discovered sensors, at most once per read interval"""
+        now = time.time()
+        if not force and self.discovered and now - self.last_read < self.read_interval:
+            return self._snapshot()
+        if not self.discovered:
+            self.discover()
+        self.last_read = now
+
+        if self.use_sysfs:
+            temperatures = self._read_sysfs_sensors(self.temperature_sensors, 1000.0)
+            fans = self._read_sysfs_sensors(self.fan_sensors, 1)
+        else:
+            temperatures = self._read_psutil_sensors('sensors_temperatures', 'temp', self.temperature_sensors)
+            fans = self._read_psutil_sensors('sensors_fans', 'fan', self.fan_sensors)
+        self._update_readings("temperature", self.temperature_sensors, temperatures)
+        self._update_readings("fan", self.fan_sensors, fans)
+
+        if self.has_battery:
+            try:
+                battery = psutil.sensors_battery()
+                if battery is not None:
+                    self.readings["battery"]["battery"] = {
+                        "state": round(battery.percent, 1),
+                        "attributes": {
+                            "power_plugged": battery.power_plugged,
+                            "seconds_left": battery.secsleft if battery.secsleft >= 0 else None
+                        }
+                    }
+            except Exception as e:
+                logger.debug(f"Could not read battery: {e}")
+
+        return self._snapshot()
@@ -0,0 +1,158 @@
+import os
+import mmap
+import math
+import json
+import struct
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Window metrics and the statistics stored for each, in record order.
+# Metrics that are not collected on a host are stored as NaN.
+ARCHIVE_METRICS = ["cpu", "memory", "container_cpu", "container_memory",
+                   "cpu_pressure", "memory_pressure", "io_pressure"]
+ARCHIVE_STATS = ["current", "min", "max", "avg"]
+
+class MetricsArchive:
+    """Long-term on-disk archive of per-window statistics.
+
+    Every publish window is stored as one fixed-width little-endian record in
+    append-only segment files named after their first timestamp. Segments are
+    rotated after a fixed number of records and deleted once they fall out of
+    the retention period. Reads memory-map the segments and yield records one
+    at a time, so exporting weeks of history never loads it all into memory.
+    """
+
+    MAGIC = b"HADA"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHH")  # magic, version, record size
+
+    METRICS = ARCHIVE_METRICS
+    STATS = ARCHIVE_STATS
+    RECORD = struct.Struct("<dI" + "f" * (len(METRICS) * len(STATS)))  # timestamp, uptime, values
+    COLUMNS = ["timestamp", "uptime"] + [f"{metric}_{stat}" for metric in ARCHIVE_METRICS for stat in ARCHIVE_STATS]
+
+    def __init__(self, directory, retention_days=28, segment_records=2880):
+        self.directory = directory
+        self.retention = retention_days * 86400
+        self.segment_records = segment_records
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        segments = self._segments()
+        self.current_segment = segments[-1][1] if segments else None
+
+    def _segments(self):
+        """Get (first timestamp, path) for every segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment_") and name.endswith(".bin"):
+                try:
+                    segments.append((int(name[8:-4]), os.path.join(self.directory, name)))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _record_count(self, path):
+        return max(0, (os.path.getsize(path) - self.HEADER.size) // self.RECORD.size)
+
+    def _new_segment(self, timestamp):
+        path = os.path.join(self.directory, f"segment_{int(timestamp):010d}.bin")
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.RECORD.size))
+        return path
+
+    def _apply_retention(self, now):
+        segments = self._segments()
+        # A segment can go once the segment after it starts before the cutoff
+        for (_, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start >= now - self.retention:
+                break
+            try:
+                os.remove(path)
+                logger.debug(f"Removed archive segment {path}")
+            except OSError as e:
+                # Windows refuses while an export still has it mapped, retry next rotation
+                logger.debug(f"Could not remove archive segment {path}: {e}")
+
+    def append(self, timestamp, uptime, statistics):
+        """Append one window of statistics as produced by DataCollector.calculate_statistics"""
+        values = []
+        for metric in self.METRICS:
+            metric_data = statistics.get(metric) or {}
+            for stat in self.STATS:
+                value = metric_data.get(stat)
+                values.append(float(value) if value is not None else math.nan)
+        record = self.RECORD.pack(float(timestamp), int(uptime), *values)
+
+        with self.lock:
+            if self.current_segment is None or self._record_count(self.current_segment) >= self.segment_records:
+                self.current_segment = self._new_segment(timestamp)
+                self._apply_retention(timestamp)
+            with open(self.current_segment, "ab") as f:
+                # Drop a torn record left behind by a crash so records stay aligned
+                misaligned = (f.tell() - self.HEADER.size) % self.RECORD.size
+                if misaligned:
+                    f.truncate(f.tell() - misaligned)
+                f.write(record)
+
+    def _read_segment(self, path, start, end):
+        """Yield records from one segment within [start, end]"""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.HEADER.size + self.RECORD.size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, version, record_size = self.HEADER.unpack_from(mapped, 0)
+                if magic != self.MAGIC or version != self.VERSION or record_size != self.RECORD.size:
+                    logger.warning(f"Skipping archive segment {path} with unknown format")
+                    return
+
+                count = (size - self.HEADER.size) // self.RECORD.size
+                # Binary search for the first record at or after start
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    if self.RECORD.unpack_from(mapped, self.HEADER.size + middle * self.RECORD.size)[0] < start:
+                        low = middle + 1
+                    else:
+                        high = middle
+
+                for index in range(low, count):
+                    record = self.RECORD.unpack_from(mapped, self.HEADER.size + index * self.RECORD.size)
+                    if record[0] > end:
+                        return
+                    yield record
+
+    def read(self, start, end):
+        """Yield raw record tuples with start <= timestamp <= end, oldest first"""
+        segments = self._segments()
+        for index, (first_timestamp, path) in enumerate(segments):
+            next_start = segments[index + 1][0] if index + 1 < len(segments) else math.inf
+            if first_timestamp > end or next_start < start:
+                continue
+            try:
+                yield from self._read_segment(path, start, end)
+            except (OSError, ValueError) as e:
+                # The segment may have been removed by retention meanwhile
+                logger.warning(f"Could not read archive segment {path}: {e}")
+
+    @staticmethod
+    def _format_value(value):
+        return "" if math.isnan(value) else f"{value:.2f}"
+
+    def export_csv(self, start, end):
+        """Yield the range as CSV lines"""
+        yield ",".join(self.COLUMNS) + "\n"
+        for record in self.read(start, end):
+            yield f"{record[0]:.2f},{record[1]}," + ",".join(self._format_value(v) for v in record[2:]) + "\n"
+
+    def export_ndjson(self, start, end):
+        """Yield the range as newline-delimited JSON objects"""
+        for record in self.read(start, end):
+            row = {"timestamp": round(record[0], 2), "uptime": record[1]}
+            for column, value in zip(self.COLUMNS[2:], record[2:]):
+                if not math.isnan(value):
+                    row[column] = round(value, 2)
+            yield json.dumps(row) + "\n"
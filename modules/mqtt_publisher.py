@@ -5,22 +5,109 @@ import json
 logger = logging.getLogger(__name__)
 
 class MQTTPublisher:
-    def __init__(self, mqtt_client, device_id):
+    def __init__(self, mqtt_client, device_id, sensor_config=None, low_footprint=False):
         self.mqtt_client = mqtt_client
         self.device_id = device_id
+        self.sensor_config = sensor_config
         self.base_topic = f"homeassistant/sensor/{device_id}"
         self.binary_base_topic = f"homeassistant/binary_sensor/{device_id}"
-        
+
+        # Topic strings used on every publish
+        self.availability_topic = f"{self.binary_base_topic}/availability"
+        self.status_topic = f"{self.binary_base_topic}/status"
+        self.uptime_topic = f"{self.base_topic}/uptime"
+        self.uptime_formatted_topic = f"{self.base_topic}/uptime_formatted"
+
+        # Per-sensor topics and config payloads, built on first publish:
+        # sensor key -> (state topic, config topic, config payload, stat topics)
+        self.sensor_topics = {}
+
+        # Configs are retained, so low-footprint mode only sends them once per
+        # connection instead of every cycle; call reset_configs() on connect
+        self.low_footprint = low_footprint
+        self.configs_sent = set()
+
         # Define metric configurations
         self.metrics = {
             "cpu": "CPU Usage",
             "memory": "Memory (RAM) Usage"
         }
 
+    def reset_configs(self):
+        """Send every sensor config again on the next publish"""
+        self.configs_sent.clear()
+
+    def _device_info(self):
+        return {
+            "identifiers": [self.device_id],
+            "name": "Computer Activity Monitor",
+            "model": "Computer Activity Monitor",
+            "manufacturer": "Custom"
+        }
+
+    def _metric_topics(self, metric_key, metric_name):
+        topics = self.sensor_topics.get(metric_key)
+        if topics is None:
+            metric_base = metric_name.lower().replace(' ', '_').replace('(', '').replace(')', '')
+            config = {
+                "name": metric_name,
+                "unique_id": f"{self.device_id}_{metric_base}",
+                "state_topic": f"{self.base_topic}/{metric_base}",
+                "unit_of_measurement": "%",
+                "device_class": "power",
+                "state_class": "measurement",
+                "device": self._device_info()
+            }
+            # Same config topic as SensorConfig.publish_configs, keep availability consistent
+            if self.sensor_config:
+                config.update(self.sensor_config.get_availability_config())
+            stat_topics = tuple(
+                (stat_type, f"{self.base_topic}/{metric_base}_{stat_type}") for stat_type in ["min", "max", "avg"]
+            )
+            topics = (f"{self.base_topic}/{metric_base}", f"{self.base_topic}/{metric_base}/config",
+                      json.dumps(config), stat_topics)
+            self.sensor_topics[metric_key] = topics
+        return topics
+
+    def _disk_topics(self, drive_key, disk_data):
+        topics = self.sensor_topics.get(drive_key)
+        if topics is None:
+            config = {
+                "name": f"Disk {disk_data['attributes']['partition']} {disk_data['attributes']['name']} (Storage usage)",
+                "unique_id": f"{self.device_id}_{drive_key}",
+                "state_topic": f"{self.base_topic}/{drive_key}",
+                "unit_of_measurement": "%",
+                "device_class": "power",
+                "state_class": "measurement",
+                "device": self._device_info()
+            }
+            if self.sensor_config:
+                config.update(self.sensor_config.get_availability_config())
+            topics = (f"{self.base_topic}/{drive_key}", f"{self.base_topic}/{drive_key}/config",
+                      json.dumps(config), ())
+            self.sensor_topics[drive_key] = topics
+        return topics
+
+    def _hardware_topics(self, kind, sensor_key, sensor_data):
+        topics = self.sensor_topics.get(sensor_key)
+        if topics is None:
+            config = self.sensor_config.get_hardware_config(kind, sensor_key, sensor_data["attributes"])
+            topics = (f"{self.base_topic}/{sensor_key}", f"{self.base_topic}/{sensor_key}/config",
+                      json.dumps(config), ())
+            self.sensor_topics[sensor_key] = topics
+        return topics
+
+    def _publish_config(self, config_topic, config_payload):
+        if self.low_footprint:
+            if config_topic in self.configs_sent:
+                return
+            self.configs_sent.add(config_topic)
+        self.mqtt_client.publish(config_topic, config_payload, retain=True)
+
     def publish_availability(self, status):
         """Publish availability status"""
         if self.mqtt_client.is_connected():
-            self.mqtt_client.publish(f"{self.binary_base_topic}/availability", status, retain=True)
+            self.mqtt_client.publish(self.availability_topic, status, retain=True)
 
     def publish_system_info(self, system_info, statistics):
         """Publish system information to MQTT"""
@@ -29,89 +116,59 @@ class MQTTPublisher:
 
         try:
             # Publish status
-            self.mqtt_client.publish(f"{self.binary_base_topic}/status", "online", retain=True)
+            self.mqtt_client.publish(self.status_topic, "online", retain=True)
 
             # Publish metrics and their statistics
             for metric_key, metric_name in self.metrics.items():
+                if metric_key not in statistics:
+                    continue
                 metric_data = statistics[metric_key]
-                metric_base = metric_name.lower().replace(' ', '_').replace('(', '').replace(')', '')
-                
+                state_topic, config_topic, config_payload, stat_topics = self._metric_topics(metric_key, metric_name)
+
                 # Publish configuration
-                config = {
-                    "name": metric_name,
-                    "unique_id": f"{self.device_id}_{metric_base}",
-                    "state_topic": f"{self.base_topic}/{metric_base}",
-                    "unit_of_measurement": "%",
-                    "device_class": "power",
-                    "state_class": "measurement",
-                    "device": {
-                        "identifiers": [self.device_id],
-                        "name": "Computer Activity Monitor",
-                        "model": "Computer Activity Monitor",
-                        "manufacturer": "Custom"
-                    }
-                }
-                self.mqtt_client.publish(
-                    f"{self.base_topic}/{metric_base}/config",
-                    json.dumps(config),
-                    retain=True
-                )
-                
+                self._publish_config(config_topic, config_payload)
+
                 # Publish current value
-                self.mqtt_client.publish(
-                    f"{self.base_topic}/{metric_base}",
-                    str(metric_data["current"])
-                )
-                
+                self.mqtt_client.publish(state_topic, str(metric_data["current"]))
+
                 # Publish statistics (min, max, avg)
-                for stat_type in ["min", "max", "avg"]:
-                    self.mqtt_client.publish(
-                        f"{self.base_topic}/{metric_base}_{stat_type}",
-                        str(metric_data[stat_type])
-                    )
+                for stat_type, stat_topic in stat_topics:
+                    self.mqtt_client.publish(stat_topic, str(metric_data[stat_type]))
 
             # Publish disk information
             for drive_key, disk_data in statistics["disk"].items():
                 try:
+                    state_topic, config_topic, config_payload, _ = self._disk_topics(drive_key, disk_data)
+
                     # Publish disk usage percentage
-                    self.mqtt_client.publish(
-                        f"{self.base_topic}/{drive_key}",
-                        str(disk_data["state"])
-                    )
-                    
+                    self.mqtt_client.publish(state_topic, str(disk_data["state"]))
+
                     # Publish disk configuration
-                    config = {
-                        "name": f"Disk {disk_data['attributes']['partition']} {disk_data['attributes']['name']} (Storage usage)",
-                        "unique_id": f"{self.device_id}_{drive_key}",
-                        "state_topic": f"{self.base_topic}/{drive_key}",
-                        "unit_of_measurement": "%",
-                        "device_class": "power",
-                        "state_class": "measurement",
-                        "device": {
-                            "identifiers": [self.device_id],
-                            "name": "Computer Activity Monitor",
-                            "model": "Computer Activity Monitor",
-                            "manufacturer": "Custom"
-                        }
-                    }
-                    self.mqtt_client.publish(
-                        f"{self.base_topic}/{drive_key}/config",
-                        json.dumps(config),
-                        retain=True
-                    )
+                    self._publish_config(config_topic, config_payload)
                 except Exception as e:
                     logger.error(f"Error publishing disk data for {drive_key}: {e}")
 
+            # Publish temperature, fan and battery sensors
+            if self.sensor_config:
+                for kind in self.sensor_config.HARDWARE_SENSOR_TYPES:
+                    for sensor_key, sensor_data in statistics.get(kind, {}).items():
+                        try:
+                            state_topic, config_topic, config_payload, _ = self._hardware_topics(kind, sensor_key, sensor_data)
+                            self.mqtt_client.publish(state_topic, str(sensor_data["state"]))
+                            self._publish_config(config_topic, config_payload)
+                        except Exception as e:
+                            logger.error(f"Error publishing {kind} data for {sensor_key}: {e}")
+
             # Publish uptime values
-            self.mqtt_client.publish(f"{self.base_topic}/uptime", str(system_info["uptime"]))
+            self.mqtt_client.publish(self.uptime_topic, str(system_info["uptime"]))
             formatted_uptime = time.strftime("%H:%M:%S", time.gmtime(system_info["uptime"]))
-            self.mqtt_client.publish(f"{self.base_topic}/uptime_formatted", formatted_uptime)
-            
+            self.mqtt_client.publish(self.uptime_formatted_topic, formatted_uptime)
+
         except Exception as e:
             logger.error(f"Error in publish_system_info: {e}")
 
     def publish_offline_status(self):
         """Publish offline status when shutting down"""
         if self.mqtt_client.is_connected():
-            self.mqtt_client.publish(f"{self.binary_base_topic}/availability", "offline", retain=True)
-            self.mqtt_client.publish(f"{self.binary_base_topic}/status", "offline", retain=True) 
\ No newline at end of file
+            self.mqtt_client.publish(self.availability_topic, "offline", retain=True)
+            self.mqtt_client.publish(self.status_topic, "offline", retain=True)
@@ -0,0 +1,153 @@
+import sys
+import os
+import time
+import threading
+import tracemalloc
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+class DebugProfiler:
+    """On-demand sampling profiler and tracemalloc snapshots for a running agent.
+
+    The sampler reads another thread's stack through sys._current_frames(), so
+    it can attach to the publish loop without that loop cooperating, including
+    while it is stuck in a slow probe.
+    """
+
+    def __init__(self, sample_interval=0.01, tracemalloc_frames=1):
+        self.sample_interval = sample_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        # Previous snapshot per consumer, so the periodic dumps and the
+        # /debug/tracemalloc endpoint each diff against their own last report
+        self.tracemalloc_snapshots = {}
+        # Only one sampling run at a time, sampling is not free
+        self.sampling_lock = threading.Lock()
+
+    @staticmethod
+    def _find_thread(thread_name):
+        for thread in threading.enumerate():
+            if thread.name == thread_name:
+                return thread
+        return None
+
+    @staticmethod
+    def _describe(code, lineno=None):
+        location = f"{os.path.basename(code.co_filename)}:{lineno if lineno is not None else code.co_firstlineno}"
+        return f"{code.co_name} ({location})"
+
+    def profile_thread(self, thread_name, seconds=30, limit=30):
+        """Sample a thread's stack for a bounded time and return a text report"""
+        thread = self._find_thread(thread_name)
+        if thread is None:
+            return f"Thread {thread_name!r} is not running"
+        if not self.sampling_lock.acquire(blocking=False):
+            return "A profile is already running"
+
+        try:
+            samples = 0
+            self_counts = Counter()
+            cumulative_counts = Counter()
+            line_counts = Counter()
+            deadline = time.monotonic() + seconds
+
+            while time.monotonic() < deadline and thread.is_alive():
+                frame = sys._current_frames().get(thread.ident)
+                if frame is not None:
+                    samples += 1
+                    self_counts[self._describe(frame.f_code)] += 1
+                    line_counts[self._describe(frame.f_code, frame.f_lineno)] += 1
+                    seen = set()
+                    while frame is not None:
+                        name = self._describe(frame.f_code)
+                        # Count recursive functions once per sample
+                        if name not in seen:
+                            cumulative_counts[name] += 1
+                            seen.add(name)
+                        frame = frame.f_back
+                time.sleep(self.sample_interval)
+        finally:
+            self.sampling_lock.release()
+
+        lines = [
+            f"Sampled thread {thread_name!r} for {seconds}s: {samples} samples "
+            f"every {self.sample_interval * 1000:.0f}ms",
+            ""
+        ]
+        if not samples:
+            return "\n".join(lines)
+
+        for title, counts in [("Self time", self_counts), ("Cumulative time", cumulative_counts), ("Hot lines", line_counts)]:
+            lines.append(f"{title}:")
+            lines.append(f"{'samples':>8} {'percent':>8}  function")
+            for name, count in counts.most_common(limit):
+                lines.append(f"{count:>8} {count * 100 / samples:>7.1f}%  {name}")
+            lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__)
+        ])
+
+    def tracemalloc_report(self, limit=20, consumer="endpoint"):
+        """Start tracing, or diff against the consumer's previous snapshot and return top allocations"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self.tracemalloc_snapshots[consumer] = self._take_snapshot()
+            return "tracemalloc started, request again later to see allocation growth"
+
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", ""]
+
+        previous = self.tracemalloc_snapshots.get(consumer)
+        if previous is not None:
+            lines.append("Growth since previous snapshot:")
+            for stat in snapshot.compare_to(previous, 'lineno')[:limit]:
+                lines.append(str(stat))
+            lines.append("")
+
+        lines.append("Top allocations:")
+        for stat in snapshot.statistics('lineno')[:limit]:
+            lines.append(str(stat))
+
+        self.tracemalloc_snapshots[consumer] = snapshot
+        return "\n".join(lines)
+
+    def stop_tracemalloc(self):
+        """Stop tracing and drop the stored snapshots"""
+        self.tracemalloc_snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            return "tracemalloc stopped"
+        return "tracemalloc was not running"
+
+    def start_periodic_dumps(self, thread_name, log_dir, interval, seconds=30, keep=20):
+        """Dump a profile (and tracemalloc diff when tracing) to log_dir every interval seconds"""
+        def dump_loop():
+            while True:
+                time.sleep(max(0, interval - seconds))
+                try:
+                    report = self.profile_thread(thread_name, seconds)
+                    if tracemalloc.is_tracing():
+                        report += "\n" + self.tracemalloc_report(consumer="dumps")
+                    path = os.path.join(log_dir, f"profile_{time.strftime('%Y%m%d_%H%M%S')}.txt")
+                    with open(path, "w") as f:
+                        f.write(report)
+                    logger.debug(f"Wrote profile to {path}")
+
+                    # Keep the log directory bounded
+                    dumps = sorted(name for name in os.listdir(log_dir) if name.startswith("profile_"))
+                    for name in dumps[:-keep]:
+                        os.remove(os.path.join(log_dir, name))
+                except Exception as e:
+                    logger.error(f"Error writing periodic profile: {e}")
+
+        logger.info(f"Dumping {seconds}s profiles of {thread_name!r} to {log_dir} every {interval}s")
+        dump_thread = threading.Thread(target=dump_loop, name="profile_dumps")
+        dump_thread.daemon = True
+        dump_thread.start()
+        return dump_thread
@@ -0,0 +1,46 @@
+import hashlib
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PublishScheduler:
+    def __init__(self, device_id, publish_interval=30, collection_interval=1, align=False):
+        self.publish_interval = publish_interval
+        self.collection_interval = collection_interval
+        self.align = align
+
+        # Stable per-device offset inside the publish interval. hash() is salted
+        # per process, so use a digest of the device id instead.
+        digest = hashlib.sha1(str(device_id).encode("utf-8")).hexdigest()
+        self.offset = (int(digest, 16) % (publish_interval * 1000)) / 1000.0
+
+        if self.align:
+            logger.info(f"Publish slots aligned to wall clock with {self.offset:.3f}s offset "
+                        f"inside a {publish_interval}s interval")
+
+    def next_slot(self, now=None):
+        """Get the wall-clock time of the next publish slot after now"""
+        if now is None:
+            now = time.time()
+        slot_index = math.floor((now - self.offset) / self.publish_interval) + 1
+        return slot_index * self.publish_interval + self.offset
+
+    def collection_ticks(self, now=None):
+        """Get the wall-clock collection ticks up to and including the next publish slot"""
+        if now is None:
+            now = time.time()
+        slot = self.next_slot(now)
+        window_start = slot - self.publish_interval
+        samples = max(1, int(self.publish_interval // self.collection_interval))
+        ticks = [window_start + i * self.collection_interval for i in range(1, samples + 1)]
+        # Land the last tick exactly on the slot regardless of float rounding
+        ticks[-1] = slot
+        return [tick for tick in ticks if tick > now]
+
+    def sleep_until(self, deadline):
+        """Sleep until the given wall-clock time"""
+        remaining = deadline - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
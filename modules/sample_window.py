@@ -0,0 +1,66 @@
+from array import array
+
+class SampleWindow:
+    """Fixed-size ring buffer of float samples backed by an array.
+
+    A drop-in for the deque(maxlen=...) sample queues in low-footprint mode:
+    samples are stored as raw doubles instead of float objects, and the
+    statistics are written into an existing dict rather than a new one.
+    """
+
+    __slots__ = ("values", "size", "count", "position")
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self.values = array("d", bytes(8 * self.size))
+        self.count = 0
+        self.position = 0
+
+    def append(self, value):
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def clear(self):
+        self.count = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("sample index out of range")
+        return self.values[(self.position - self.count + index) % self.size]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.values[(self.position - self.count + index) % self.size]
+
+    def fill_statistics(self, stats):
+        """Write current, min, max and avg into an existing dict"""
+        if not self.count:
+            stats["current"] = stats["min"] = stats["max"] = stats["avg"] = 0.0
+            return stats
+        start = self.position - self.count
+        values = self.values
+        size = self.size
+        low = high = total = values[start % size]
+        for index in range(start + 1, self.position):
+            value = values[index % size]
+            total += value
+            if value < low:
+                low = value
+            elif value > high:
+                high = value
+        stats["current"] = values[(self.position - 1) % size]
+        stats["min"] = low
+        stats["max"] = high
+        stats["avg"] = round(total / self.count, 2)
+        return stats
@@ -2,11 +2,22 @@ import json
 import os
 
 class SensorConfig:
-    def __init__(self, device_name, device_id):
+    # Unit and Home Assistant device class per hardware sensor kind.
+    # HA has no device class for fan speed, so fans only carry a unit.
+    HARDWARE_SENSOR_TYPES = {
+        "temperature": {"unit": "°C", "device_class": "temperature"},
+        "fan": {"unit": "RPM", "device_class": None},
+        "battery": {"unit": "%", "device_class": "battery"}
+    }
+
+    def __init__(self, device_name, device_id, metrics=None, gateway_availability_topic=None):
         self.device_name = device_name
         self.device_id = device_id
+        self.metrics = metrics or ["CPU Usage", "Memory (RAM) Usage"]
         self.base_topic = f"homeassistant/sensor/{device_id}"
         self.binary_base_topic = f"homeassistant/binary_sensor/{device_id}"
+        # Devices bridged by a gateway are only available while the gateway is
+        self.gateway_availability_topic = gateway_availability_topic
         
         self.device_info = {
             "identifiers": [device_id],
@@ -15,16 +26,30 @@ class SensorConfig:
             "manufacturer": "Custom"
         }
 
+    def get_availability_config(self):
+        """Get the availability fields shared by every sensor config"""
+        if not self.gateway_availability_topic:
+            return {
+                "availability_topic": f"{self.binary_base_topic}/availability",
+                "payload_available": "online",
+                "payload_not_available": "offline"
+            }
+        return {
+            "availability": [
+                {"topic": topic, "payload_available": "online", "payload_not_available": "offline"}
+                for topic in [f"{self.binary_base_topic}/availability", self.gateway_availability_topic]
+            ],
+            "availability_mode": "all"
+        }
+
     def get_status_config(self):
         return {
             "name": f"{self.device_name} Status",
             "unique_id": f"{self.device_id}_status",
             "state_topic": f"{self.binary_base_topic}/status",
-            "availability_topic": f"{self.binary_base_topic}/availability",
             "payload_on": "online",
             "payload_off": "offline",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "device_class": "connectivity",
             "device": self.device_info
         }
@@ -34,9 +59,7 @@ class SensorConfig:
             "name": f"{self.device_name} {metric_name}",
             "unique_id": f"{self.device_id}_{metric_name.lower().replace(' ', '_')}",
             "state_topic": f"{self.base_topic}/{metric_name.lower().replace(' ', '_')}",
-            "availability_topic": f"{self.binary_base_topic}/availability",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "unit_of_measurement": unit,
             "device_class": device_class,
             "state_class": "measurement",
@@ -48,9 +71,7 @@ class SensorConfig:
             "name": f"{self.device_name} {metric_name} ({stat_type.title()})",
             "unique_id": f"{self.device_id}_{metric_name.lower().replace(' ', '_')}_{stat_type}",
             "state_topic": f"{self.base_topic}/{metric_name.lower().replace(' ', '_')}_{stat_type}",
-            "availability_topic": f"{self.binary_base_topic}/availability",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "unit_of_measurement": unit,
             "device_class": device_class,
             "state_class": "measurement",
@@ -63,15 +84,35 @@ class SensorConfig:
             "name": f"{self.device_name} Disk {mountpoint} ({fstype})",
             "unique_id": f"{self.device_id}_disk_{mountpoint.replace('/', '_').replace(':', '')}",
             "state_topic": f"{self.base_topic}/disk_{mountpoint.replace('/', '_').replace(':', '')}",
-            "availability_topic": f"{self.binary_base_topic}/availability",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "unit_of_measurement": "%",
             "device_class": "power",
             "state_class": "measurement",
             "device": self.device_info
         }
 
+    def get_hardware_config(self, kind, sensor_key, attributes=None):
+        """Get configuration for a temperature, fan or battery sensor"""
+        sensor_type = self.HARDWARE_SENSOR_TYPES[kind]
+        attributes = attributes or {}
+        if kind == "battery":
+            name = f"{self.device_name} Battery"
+        else:
+            name = f"{self.device_name} {kind.title()} {attributes.get('chip', '')} {attributes.get('label', sensor_key)}"
+
+        config = {
+            "name": " ".join(name.split()),
+            "unique_id": f"{self.device_id}_{sensor_key}",
+            "state_topic": f"{self.base_topic}/{sensor_key}",
+            **self.get_availability_config(),
+            "unit_of_measurement": sensor_type["unit"],
+            "state_class": "measurement",
+            "device": self.device_info
+        }
+        if sensor_type["device_class"]:
+            config["device_class"] = sensor_type["device_class"]
+        return config
+
     def cleanup_old_sensors(self, mqtt_client):
         """Clean up old sensors by publishing empty messages to remove them from Home Assistant"""
         import logging
@@ -147,9 +188,8 @@ class SensorConfig:
             retain=True
         )
 
-        # CPU sensors
-        metrics = ["CPU Usage", "Memory (RAM) Usage"]
-        for metric in metrics:
+        # CPU, memory and any cgroup sensors
+        for metric in self.metrics:
             # Current value sensor
             mqtt_client.publish(
                 f"{self.base_topic}/{metric.lower().replace(' ', '_').replace('(', '').replace(')', '')}/config",
@@ -170,9 +210,7 @@ class SensorConfig:
             "name": f"{self.device_name} Uptime (Seconds)",
             "unique_id": f"{self.device_id}_uptime",
             "state_topic": f"{self.base_topic}/uptime",
-            "availability_topic": f"{self.binary_base_topic}/availability",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "device": self.device_info
         }
         
@@ -180,9 +218,7 @@ class SensorConfig:
             "name": f"{self.device_name} Uptime (Formatted)",
             "unique_id": f"{self.device_id}_uptime_formatted",
             "state_topic": f"{self.base_topic}/uptime_formatted",
-            "availability_topic": f"{self.binary_base_topic}/availability",
-            "payload_available": "online",
-            "payload_not_available": "offline",
+            **self.get_availability_config(),
             "device": self.device_info
         }
 